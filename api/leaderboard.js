@@ -6,6 +6,8 @@
 // 4) Vercel Edge Config if EDGE_CONFIG is set (⚠️ Not recommended - read-optimized, 64KB limit)
 // 5) Falls back to 501 when not configured (frontend will fall back to localStorage)
 
+const crypto = require('crypto');
+
 const KEY = 'bollard_striker:leaderboard';
 const POSTGRES_URL = process.env.POSTGRES_URL;
 const SUPABASE_URL = process.env.SUPABASE_URL;
@@ -305,6 +307,20 @@ async function sbInsert(entry) {
   }
 }
 
+// Sends a GET response with an ETag so clients can revalidate with If-None-Match
+// (the desktop client does); a matching tag gets a 304 with no body.
+function sendBoard(req, res, payload) {
+  const body = JSON.stringify(payload);
+  const etag = `"${crypto.createHash('sha1').update(body).digest('hex')}"`;
+  res.setHeader('ETag', etag);
+  res.setHeader('Cache-Control', 'no-cache');
+  const ifNoneMatch = req.headers && req.headers['if-none-match'];
+  if (ifNoneMatch && ifNoneMatch.split(',').map((tag) => tag.trim()).includes(etag)) {
+    return res.status(304).end();
+  }
+  return res.status(200).end(body);
+}
+
 module.exports = async (req, res) => {
   res.setHeader('Content-Type', 'application/json');
   res.setHeader('Cache-Control', 'no-store');
@@ -316,7 +332,7 @@ module.exports = async (req, res) => {
           await vpInitTable(); // Ensure table exists
           const raw = await vpFetchRaw(100);
           const entries = normalize(raw).sort((a, b) => Number(b.score) - Number(a.score)).slice(0, 25);
-          return res.status(200).end(JSON.stringify({ entries, source: 'vercel-postgres' }));
+          return sendBoard(req, res, { entries, source: 'vercel-postgres' });
         } catch (e) {
           console.error('Vercel Postgres fetch error:', e);
           // Fall through to Supabase
@@ -328,7 +344,7 @@ module.exports = async (req, res) => {
         try {
           const raw = await sbFetchRaw(100);
           const entries = normalize(raw).sort((a, b) => Number(b.score) - Number(a.score)).slice(0, 25);
-          return res.status(200).end(JSON.stringify({ entries, source: 'supabase' }));
+          return sendBoard(req, res, { entries, source: 'supabase' });
         } catch (e) {
           console.error('Supabase fetch error:', e);
           // Fall through to KV
@@ -341,7 +357,7 @@ module.exports = async (req, res) => {
           const entriesRaw = await kvGetLeaderboard();
           const entries = normalize(entriesRaw);
           try { await kvSetLeaderboard(entries); } catch {}
-          return res.status(200).end(JSON.stringify({ entries, source: 'kv' }));
+          return sendBoard(req, res, { entries, source: 'kv' });
         } catch (e) {
           console.error('KV fetch error:', e);
           // Fall through to Edge Config
@@ -353,7 +369,7 @@ module.exports = async (req, res) => {
         try {
           const entriesRaw = await ecGetLeaderboard();
           const entries = normalize(entriesRaw);
-          return res.status(200).end(JSON.stringify({ entries, source: 'edge-config' }));
+          return sendBoard(req, res, { entries, source: 'edge-config' });
         } catch (e) {
           console.error('Edge Config fetch error:', e);
           // Return empty with 501 to indicate not configured
@@ -0,0 +1,302 @@
+"""
+Asset host: several game sessions on one machine, assets decoded once.
+
+Every game process loads and scales visitor.png and bollard.png, decodes the
+MP3 sound effects to PCM and builds the collision offset table (see
+collision.py).  The host does all of that once, into one
+multiprocessing.shared_memory block, and starts the sessions with the
+block's name in BOLLARD_ASSETS.  A session then picks the assets up from
+the block:
+
+    sprites          pygame.image.frombuffer(), already at their drawn size in the
+                     display's alpha pixel format, so the render pipeline uses them as is
+    collision table  the MaskCollider's offset table, fully precomputed
+    sound effects    pygame.mixer.Sound(buffer=...), raw samples in the mixer's format
+
+Sprites and the collision table are used in place, never copied into the
+session.  Sound effects are only decoded once: Sound(buffer=...) copies the
+samples, so every session still holds its own copy (most of the block, about
+1.75 MiB), but it skips decoding the MP3s at startup.  Fonts and the background
+music (streamed from the file) are still per session.  A session falls back
+to loading the files when the block is missing or doesn't match (e.g. a
+different mixer format).
+
+The block is laid out as a 4-byte header length, a JSON manifest (name ->
+offset, length and shape) and the assets, each aligned to ALIGN bytes.
+
+    python asset_host.py run --sessions 3 -- --autopilot      # arguments after -- go to each game
+    python asset_host.py bench --sessions 4                   # spawn time and memory per session
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import pygame
+
+from collision import MaskCollider
+
+ASSETS_ENV = 'BOLLARD_ASSETS'
+FORMAT_VERSION = 1
+ALIGN = 64
+HEADER = struct.Struct('<I')
+# Byte order of convert_alpha()'s ARGB8888 pixels, which are native 32-bit words.  A display
+# that converts to another format still works: the render pipeline copies sprites that don't match.
+PIXEL_FORMAT = 'BGRA' if sys.byteorder == 'little' else 'ARGB'
+
+# Assets as the game uses them: sprites at their drawn size, sound effects decoded
+SPRITES = {'visitor': ('visitor.png', (100, 100)), 'bollard': ('bollard.png', (50, 50))}
+SOUNDS = {'collision': 'sounds/collision.mp3', 'click': 'sounds/click.mp3'}
+
+
+def decode_assets():
+    """Decodes everything once.  Returns (manifest entries, blobs) in layout order."""
+    entries = {}
+    blobs = []
+    images = {}
+    for name, (path, size) in SPRITES.items():
+        images[name] = pygame.transform.scale(pygame.image.load(path), size)
+        entries[name] = {'kind': 'sprite', 'size': list(size)}
+        blobs.append((name, pygame.image.tobytes(images[name], PIXEL_FORMAT)))
+
+    # Same images, same masks: the table the game would build for itself
+    collider = MaskCollider(images['visitor'], images['bollard'])
+    collider.precompute()
+    entries['collision_table'] = {'kind': 'collision', 'sizes': list(collider.sizes)}
+    blobs.append(('collision_table', bytes(collider.overlaps)))
+
+    # Decoding doesn't need a sound card: the sessions open the audio device, not the host
+    driver = os.environ.get('SDL_AUDIODRIVER')
+    os.environ['SDL_AUDIODRIVER'] = 'dummy'
+    try:
+        pygame.mixer.init()
+        mixer = pygame.mixer.get_init()
+        for name, path in SOUNDS.items():
+            entries[name] = {'kind': 'sound', 'mixer': list(mixer)}
+            blobs.append((name, pygame.mixer.Sound(path).get_raw()))
+        pygame.mixer.quit()
+    except pygame.error as e:
+        print(f"Error decoding sounds: {e}. Sessions will load their own.")
+    finally:
+        if driver is None:
+            del os.environ['SDL_AUDIODRIVER']
+        else:
+            os.environ['SDL_AUDIODRIVER'] = driver
+    return entries, blobs
+
+
+class SessionMemory(shared_memory.SharedMemory):
+    """An attached block that stays mapped until the process exits: the session's
+    surfaces and collision table point into it, so it can't be unmapped while they exist."""
+
+    def __del__(self):
+        pass
+
+
+class SharedAssets:
+    def __init__(self, shm, manifest, owner=False):
+        self.shm = shm
+        self.manifest = manifest
+        self.owner = owner  # The host created the block and unlinks it
+        self.name = shm.name
+
+    @classmethod
+    def create(cls):
+        entries, blobs = decode_assets()
+        # Offsets depend on the manifest's length, which depends on the offsets: lay out
+        # the data after room for the manifest with every offset at its widest
+        for name, blob in blobs:
+            entries[name].update(offset=0, length=len(blob))
+        room = HEADER.size + len(json.dumps({'version': FORMAT_VERSION, 'assets': entries})) + 16 * len(blobs)
+        offset = -(-room // ALIGN) * ALIGN
+        for name, blob in blobs:
+            entries[name]['offset'] = offset
+            offset += -(-len(blob) // ALIGN) * ALIGN
+        manifest = {'version': FORMAT_VERSION, 'assets': entries}
+        header = json.dumps(manifest).encode()
+
+        shm = shared_memory.SharedMemory(create=True, size=offset)
+        HEADER.pack_into(shm.buf, 0, len(header))
+        shm.buf[HEADER.size:HEADER.size + len(header)] = header
+        for name, blob in blobs:
+            start = entries[name]['offset']
+            shm.buf[start:start + len(blob)] = blob
+        return cls(shm, manifest, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        """Opens the host's block, or returns None (and the session loads its own assets)."""
+        try:
+            if sys.version_info >= (3, 13):
+                shm = SessionMemory(name, track=False)  # The host owns the block
+            else:
+                shm = SessionMemory(name)
+        except (FileNotFoundError, ValueError, OSError) as e:
+            print(f"Shared assets {name} unavailable ({e}). Loading assets from files.")
+            return None
+        if sys.version_info < (3, 13) and os.name == 'posix':
+            # Older Pythons register attached blocks with this process's resource tracker
+            # (POSIX only), which would unlink the host's block when the session exits
+            resource_tracker.unregister('/' + shm.name, 'shared_memory')
+        try:
+            length, = HEADER.unpack_from(shm.buf, 0)
+            manifest = json.loads(bytes(shm.buf[HEADER.size:HEADER.size + length]))
+        except (struct.error, ValueError) as e:
+            print(f"Shared assets {name} are corrupted ({e}). Loading assets from files.")
+            shm.close()
+            return None
+        if manifest.get('version') != FORMAT_VERSION:
+            print(f"Shared assets {name} are from another version. Loading assets from files.")
+            shm.close()
+            return None
+        return cls(shm, manifest)
+
+    def view(self, name):
+        """The asset's bytes, in place (None if the host doesn't have it)."""
+        entry = self.manifest['assets'].get(name)
+        if entry is None:
+            return None
+        return self.shm.buf[entry['offset']:entry['offset'] + entry['length']]
+
+    def surface(self, name):
+        """A sprite as a Surface over the shared pixels (drawn as is, never written)."""
+        entry = self.manifest['assets'].get(name)
+        if entry is None:
+            return None
+        return pygame.image.frombuffer(self.view(name), tuple(entry['size']), PIXEL_FORMAT)
+
+    def sound(self, name):
+        """A sound effect from the decoded samples (the mixer copies them), or None if its format differs."""
+        entry = self.manifest['assets'].get(name)
+        if entry is None or pygame.mixer.get_init() != tuple(entry['mixer']):
+            return None
+        return pygame.mixer.Sound(buffer=self.view(name))
+
+    def collision_table(self, collider):
+        """The precomputed offset table for `collider`, or None if its sprites differ."""
+        entry = self.manifest['assets'].get('collision_table')
+        if entry is None or tuple(entry['sizes']) != collider.sizes or entry['length'] != len(collider.overlaps):
+            return None
+        return self.view('collision_table')
+
+    def close(self):
+        # Surfaces and the collision table made from the block keep it mapped; exiting releases it
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+def session_env(assets, index):
+    env = dict(os.environ)
+    if assets is not None:
+        env[ASSETS_ENV] = assets.name
+    else:
+        env.pop(ASSETS_ENV, None)
+    # Each session is its own kiosk as far as score history and kiosk sync go
+    node = os.environ.get('BOLLARD_NODE') or socket.gethostname()
+    env['BOLLARD_NODE'] = f"{node}-{index + 1}"
+    return env
+
+
+def run(sessions, game_args):
+    # A service manager stops the host with SIGTERM: take the sessions down with it
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    assets = SharedAssets.create()
+    print(f"Shared assets: {assets.shm.size / 1024:.0f} KiB in {assets.name}")
+    processes = []
+    try:
+        for index in range(sessions):
+            processes.append(subprocess.Popen([sys.executable, 'bollard_striker.py', *game_args],
+                                              env=session_env(assets, index)))
+        for process in processes:
+            process.wait()
+    except (KeyboardInterrupt, SystemExit):
+        for process in processes:
+            if process.poll() is None:
+                process.terminate()
+    finally:
+        for process in processes:
+            process.wait()
+        assets.close()
+    return max((process.returncode for process in processes), default=0)
+
+
+# A session up to the point the game is ready: the game module is imported (that's
+# where it loads everything), then it reports its private memory
+PROBE = """
+import json, os, sys, time
+started = time.perf_counter()
+import bollard_striker
+ready_ms = (time.perf_counter() - started) * 1000
+status = dict(line.split(':', 1) for line in open('/proc/self/status') if ':' in line)
+kb = lambda key: int(status.get(key, '0 kB').split()[0])
+print(json.dumps({'ready_ms': ready_ms, 'anon_kb': kb('RssAnon'), 'shmem_kb': kb('RssShmem'),
+                  'shared': bollard_striker.shared_assets is not None}))
+"""
+
+
+def probe(assets, index):
+    env = session_env(assets, index)
+    env.setdefault('SDL_VIDEODRIVER', 'dummy')
+    env.setdefault('SDL_AUDIODRIVER', 'dummy')
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True, check=True).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['spawn_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def bench(sessions):
+    started = time.perf_counter()
+    assets = SharedAssets.create()
+    create_ms = (time.perf_counter() - started) * 1000
+    print(f"host: decoded {len(assets.manifest['assets'])} assets into {assets.shm.size / 1024:.0f} KiB "
+          f"in {create_ms:.0f} ms")
+    kinds = {}
+    for entry in assets.manifest['assets'].values():
+        kinds[entry['kind']] = kinds.get(entry['kind'], 0) + entry['length']
+    print(f"  used in place: {(kinds.get('sprite', 0) + kinds.get('collision', 0)) / 1024:.0f} KiB, "
+          f"copied into each session by the mixer: {kinds.get('sound', 0) / 1024:.0f} KiB of sound effects")
+    try:
+        rows = []
+        for label, shared in (('files', None), ('shared assets', assets)):
+            results = [probe(shared, index) for index in range(sessions)]
+            rows.append((label, results))
+    finally:
+        assets.close()
+    print(f"{'session assets':<16}{'spawn':>10}{'import':>10}{'private':>12}{'shared':>10}   (mean of {sessions})")
+    for label, results in rows:
+        mean = lambda key: sum(result[key] for result in results) / len(results)
+        print(f"{label:<16}{mean('spawn_ms'):>7.0f} ms{mean('ready_ms'):>7.0f} ms"
+              f"{mean('anon_kb') / 1024:>8.1f} MiB{mean('shmem_kb') / 1024:>6.1f} MiB")
+    print(f"sessions attached: {all(result['shared'] for result in rows[1][1])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run game sessions that share decoded assets.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="decode the assets once and start the sessions")
+    run_parser.add_argument('--sessions', type=int, default=2)
+    run_parser.add_argument('game_args', nargs=argparse.REMAINDER, help="arguments for every game, after --")
+    bench_parser = subparsers.add_parser('bench', help="spawn time and memory per session, with and without")
+    bench_parser.add_argument('--sessions', type=int, default=4)
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        game_args = args.game_args[1:] if args.game_args[:1] == ['--'] else args.game_args
+        return run(args.sessions, game_args)
+    bench(args.sessions)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+"""
+Lookahead autopilot for Bollard Striker.
+
+Predicts where every bollard will be over the next few frames from the current
+bollard_speed, then runs a beam search over LEFT/STAY/RIGHT sequences to find
+a path that keeps the visitor clear.  States are deduplicated in a
+transposition table keyed on (quantized visitor x, depth), and the search stops
+deepening as soon as the per-frame time budget is used up, so a decision never
+takes much longer than the budget.
+
+Used as the "expert" player in autotune.py and as a load generator for soak
+runs.  Every decision is timed; latency_stats() reports the distribution.
+"""
+import time
+from collections import deque
+
+from collision import default_collider
+from simulation import LEFT, RIGHT, SCREEN_HEIGHT, SCREEN_WIDTH, STAY, VISITOR_SIZE, VISITOR_SPEED
+
+MOVES = (STAY, LEFT, RIGHT)  # STAY first so ties prefer not moving
+
+
+class Autopilot:
+    def __init__(self, horizon=60, step_frames=4, beam_width=24, quantum=4,
+                 time_budget=0.002, history=3600, collider=None):
+        self.horizon = horizon            # Frames to look ahead
+        self.step_frames = step_frames    # Frames each searched move is held for
+        self.beam_width = beam_width      # States kept per depth
+        self.quantum = quantum            # Pixels per transposition-table cell
+        self.time_budget = time_budget    # Seconds per decision, None for a full fixed-depth search
+        self.collider = default_collider() if collider is None else collider  # Same hits as the game
+        self.latencies = deque(maxlen=history)
+        self.decisions = 0
+        self.over_budget = 0
+
+    def danger_intervals(self, visitor_y, bollard_list, bollard_speed):
+        """
+        For each future frame, the visitor x ranges that would collide with a bollard.
+
+        Bollards that leave the screen are respawned off-screen by the game and
+        can't reach the visitor inside the horizon, so they are dropped.  The
+        ranges come from the sprite masks, like the game's hits: x collides when
+        low < x < high.
+        """
+        hit_spans = self.collider.hit_spans
+        frames = []
+        for frame in range(1, self.horizon + 1):
+            intervals = []
+            for bx, by in bollard_list:
+                y = by + bollard_speed * frame
+                if y > SCREEN_HEIGHT:
+                    continue
+                for first, last in hit_spans(int(y - visitor_y)):
+                    intervals.append((bx - last - 1, bx - first + 1))
+            frames.append(intervals)
+        return frames
+
+    def decide(self, visitor_x, visitor_y, bollard_list, bollard_speed):
+        """Returns LEFT, STAY or RIGHT for the current frame."""
+        started = time.perf_counter()
+        deadline = started + self.time_budget if self.time_budget is not None else None
+        move = self._search(visitor_x, visitor_y, bollard_list, bollard_speed, deadline)
+        elapsed = time.perf_counter() - started
+        self.latencies.append(elapsed)
+        self.decisions += 1
+        if self.time_budget is not None and elapsed > self.time_budget:
+            self.over_budget += 1
+        return move
+
+    def _search(self, visitor_x, visitor_y, bollard_list, bollard_speed, deadline):
+        danger = self.danger_intervals(visitor_y, bollard_list, bollard_speed)
+        max_x = SCREEN_WIDTH - VISITOR_SIZE
+        centre = max_x / 2
+
+        # Beam entries are (x, first move); the first move is what we return
+        beam = [(visitor_x, None)]
+        best_move = STAY
+        frame = 0
+        while frame < self.horizon:
+            if deadline is not None and frame and time.perf_counter() > deadline:
+                break
+            steps = min(self.step_frames, self.horizon - frame)
+            seen = {}  # Transposition table: quantized x -> (score, entry)
+            out_of_time = False
+            for x, first in beam:
+                if deadline is not None and frame and time.perf_counter() > deadline:
+                    out_of_time = True  # A half-expanded depth isn't comparable, drop it
+                    break
+                for move in MOVES:
+                    new_x = x
+                    alive = True
+                    for offset in range(steps):
+                        # Same movement rules as main_game()
+                        if move == LEFT and new_x > 0:
+                            new_x -= VISITOR_SPEED
+                        elif move == RIGHT and new_x < max_x:
+                            new_x += VISITOR_SPEED
+                        for low, high in danger[frame + offset]:
+                            if low < new_x < high:
+                                alive = False
+                                break
+                        if not alive:
+                            break
+                    if not alive:
+                        continue
+                    key = new_x // self.quantum
+                    score = self._score(new_x, danger, frame + steps, centre)
+                    if move != STAY:
+                        score -= 0.5  # Mild preference for holding still
+                    if key not in seen or score > seen[key][0]:
+                        seen[key] = (score, (new_x, first if first is not None else move))
+            if out_of_time or not seen:
+                break  # Every path collides; keep the best move from the last depth
+            ranked = sorted(seen.values(), key=lambda item: item[0], reverse=True)
+            beam = [entry for _, entry in ranked[:self.beam_width]]
+            best_move = beam[0][1]
+            frame += steps
+        return best_move
+
+    def _score(self, x, danger, frame, centre):
+        # Clearance from the nearest bollard that's about to arrive, then stay near the middle
+        clearance = 200
+        for intervals in danger[frame:frame + 2 * self.step_frames]:
+            for low, high in intervals:
+                if x <= low:
+                    clearance = min(clearance, low - x)
+                elif x >= high:
+                    clearance = min(clearance, x - high)
+        return clearance - abs(x - centre) * 0.05
+
+    def latency_stats(self):
+        """Decision latency summary in milliseconds."""
+        if not self.latencies:
+            return {'decisions': 0}
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            'decisions': self.decisions,
+            'p50_ms': ordered[count // 2] * 1000,
+            'p95_ms': ordered[min(count - 1, int(count * 0.95))] * 1000,
+            'max_ms': ordered[-1] * 1000,
+            'over_budget': self.over_budget,
+        }
+
+    def report(self):
+        stats = self.latency_stats()
+        if not stats['decisions']:
+            return "Autopilot: no decisions made"
+        return (f"Autopilot: {stats['decisions']} decisions, p50 {stats['p50_ms']:.2f} ms, "
+                f"p95 {stats['p95_ms']:.2f} ms, max {stats['max_ms']:.2f} ms, "
+                f"{stats['over_budget']} over budget")
@@ -0,0 +1,257 @@
+"""
+Monte Carlo difficulty-curve autotuner.
+
+Runs many headless games (see simulation.py) with a scripted player against
+every candidate parameter set on a grid, measures how long the player survives
+overall and in each level, and writes the best set to difficulty.json, which
+bollard_striker.py loads at startup.
+
+Results are memoized on disk per parameter tuple, so re-running with a wider
+grid only simulates the new points.
+
+    python autotune.py --bot dodger --games 200 --bollard-speed 5,6,7,8 --speed-step 0.5,1
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+
+import simulation
+from autopilot import Autopilot
+from simulation import DEFAULT_DIFFICULTY, FRAME_RATE, LEFT, RIGHT, RULES_VERSION, STAY
+
+CACHE_FILE = 'autotune_cache.json'
+DIFFICULTY_FILE = 'difficulty.json'
+
+# Order of the parameters in cache keys and grid tuples
+PARAMETERS = ('bollard_speed', 'speed_step', 'level_threshold', 'multiplier_step')
+
+
+# Scripted players.  Each takes a SimGame and returns LEFT, STAY or RIGHT.
+def idle_bot(game):
+    return STAY
+
+
+def make_random_bot(seed):
+    rng = random.Random(seed)
+    state = {'move': STAY, 'hold': 0}
+
+    def random_bot(game):
+        # Hold a direction for a few frames, like a player tapping the keys
+        if state['hold'] <= 0:
+            state['move'] = rng.choice((LEFT, STAY, RIGHT))
+            state['hold'] = rng.randint(5, 30)
+        state['hold'] -= 1
+        return state['move']
+    return random_bot
+
+
+def make_dodger_bot(seed, reaction_frames=8):
+    """Steers away from the nearest bollard heading for the visitor, reacting a few frames late."""
+    rng = random.Random(seed)
+    state = {'move': STAY, 'wait': 0}
+
+    def dodger_bot(game):
+        if state['wait'] > 0:
+            state['wait'] -= 1
+            return state['move']
+        centre = game.visitor_x + simulation.VISITOR_SIZE / 2
+        threat = None
+        for bx, by in game.bollard_list:
+            if by + simulation.BOLLARD_HEIGHT < game.visitor_y - 250 or by > game.visitor_y + simulation.VISITOR_SIZE:
+                continue
+            if bx + simulation.BOLLARD_WIDTH + 20 > game.visitor_x and bx - 20 < game.visitor_x + simulation.VISITOR_SIZE:
+                if threat is None or by > threat[1]:
+                    threat = (bx, by)
+        if threat is None:
+            move = STAY
+        else:
+            bollard_centre = threat[0] + simulation.BOLLARD_WIDTH / 2
+            move = LEFT if bollard_centre > centre else RIGHT
+            if move == LEFT and game.visitor_x <= 0:
+                move = RIGHT
+            elif move == RIGHT and game.visitor_x >= simulation.SCREEN_WIDTH - simulation.VISITOR_SIZE:
+                move = LEFT
+        if move != state['move']:
+            state['wait'] = rng.randint(0, reaction_frames)
+            state['move'], move = move, state['move']
+        return move
+    return dodger_bot
+
+
+def make_expert_bot(seed):
+    """The lookahead autopilot, run without a time budget so results are reproducible."""
+    autopilot = Autopilot(time_budget=None)
+
+    def expert_bot(game):
+        return autopilot.decide(game.visitor_x, game.visitor_y, game.bollard_list, game.bollard_speed)
+    return expert_bot
+
+
+BOTS = {
+    'idle': lambda seed: idle_bot,
+    'random': make_random_bot,
+    'dodger': make_dodger_bot,
+    'expert': make_expert_bot,
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+
+def evaluate(params, bot, games, seed):
+    """Plays a batch of games for one parameter tuple and summarizes survival times."""
+    difficulty = dict(zip(PARAMETERS, params))
+    survival = []
+    level_times = {}  # level -> seconds spent in it, for levels the bot got through
+    deaths = {}       # level -> games that ended in it
+    for game_index in range(games):
+        game_seed = seed * 1000003 + game_index
+        result = simulation.play(BOTS[bot](game_seed), difficulty, game_seed)
+        survival.append(result['frames'] / FRAME_RATE)
+        for level, frames in enumerate(result['level_frames'][:-1], start=1):
+            level_times.setdefault(level, []).append(frames / FRAME_RATE)
+        deaths[result['level']] = deaths.get(result['level'], 0) + 1
+
+    levels = {}
+    for level in sorted(set(level_times) | set(deaths)):
+        times = level_times.get(level, [])
+        levels[str(level)] = {
+            'completed': len(times),
+            'died': deaths.get(level, 0),
+            'median_seconds': statistics.median(times) if times else None,
+            'p10_seconds': percentile(times, 0.1) if times else None,
+            'p90_seconds': percentile(times, 0.9) if times else None,
+        }
+    return {
+        'median_survival': statistics.median(survival),
+        'p10_survival': percentile(survival, 0.1),
+        'p90_survival': percentile(survival, 0.9),
+        'levels': levels,
+    }
+
+
+def loss(stats, target_survival, target_level_time, min_samples):
+    """How far a parameter set is from the target curve (0 is a perfect fit)."""
+    total = ((stats['median_survival'] - target_survival) / target_survival) ** 2
+    level_errors = [
+        ((level['median_seconds'] - target_level_time) / target_level_time) ** 2
+        for level in stats['levels'].values()
+        if level['completed'] >= min_samples
+    ]
+    if level_errors:
+        total += sum(level_errors) / len(level_errors)
+    return total
+
+
+def cache_key(params, bot, games, seed):
+    return '|'.join([f"rules{RULES_VERSION}", bot, str(games), str(seed)] + [repr(float(value)) for value in params])
+
+
+def load_cache(path):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print("Autotune cache is corrupted. Starting a new one.")
+    return {}
+
+
+def save_cache(cache, path):
+    # Write to a temporary file first so an interrupted run can't corrupt the cache
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+
+def parse_values(text, kind=float):
+    return [kind(value) for value in text.split(',') if value.strip()]
+
+
+def tune(grid, bot, games, seed, target_survival, target_level_time,
+         min_samples=10, cache_path=CACHE_FILE, workers=None):
+    """Evaluates every point on the grid (using the cache where possible) and returns them ranked."""
+    cache = load_cache(cache_path)
+    pending = [params for params in grid if cache_key(params, bot, games, seed) not in cache]
+    if pending:
+        print(f"Simulating {len(pending)} parameter sets ({len(grid) - len(pending)} cached)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {params: pool.submit(evaluate, params, bot, games, seed) for params in pending}
+            for done, (params, future) in enumerate(futures.items(), start=1):
+                cache[cache_key(params, bot, games, seed)] = future.result()
+                # Save as we go so a long search can be interrupted and resumed
+                if done % 10 == 0 or done == len(futures):
+                    save_cache(cache, cache_path)
+
+    ranked = []
+    for params in grid:
+        stats = cache[cache_key(params, bot, games, seed)]
+        ranked.append((loss(stats, target_survival, target_level_time, min_samples), params, stats))
+    ranked.sort(key=lambda item: item[0])
+    return ranked
+
+
+def write_difficulty(params, stats, path, bot, games):
+    # Keep whole numbers as ints so the file reads like the defaults
+    difficulty = {name: int(value) if float(value).is_integer() else value
+                  for name, value in zip(PARAMETERS, params)}
+    difficulty['tuning'] = {'bot': bot, 'games': games, 'stats': stats}
+    with open(path, 'w') as f:
+        json.dump(difficulty, f, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune Bollard Striker difficulty with headless games.")
+    parser.add_argument('--bot', choices=sorted(BOTS), default='dodger')
+    parser.add_argument('--games', type=int, default=100, help="games per parameter set")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--bollard-speed', default=str(DEFAULT_DIFFICULTY['bollard_speed']))
+    parser.add_argument('--speed-step', default=str(DEFAULT_DIFFICULTY['speed_step']))
+    parser.add_argument('--level-threshold', default=str(DEFAULT_DIFFICULTY['level_threshold']))
+    parser.add_argument('--multiplier-step', default=str(DEFAULT_DIFFICULTY['multiplier_step']))
+    parser.add_argument('--target-survival', type=float, default=90.0, help="median game length in seconds")
+    parser.add_argument('--target-level-time', type=float, default=20.0, help="median seconds spent per level")
+    parser.add_argument('--min-samples', type=int, default=10, help="games needed before a level counts")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache', default=CACHE_FILE)
+    parser.add_argument('--output', default=DIFFICULTY_FILE)
+    parser.add_argument('--top', type=int, default=5, help="ranked results to print")
+    parser.add_argument('--dry-run', action='store_true', help="don't write the difficulty file")
+    args = parser.parse_args()
+
+    grid = list(product(
+        parse_values(args.bollard_speed),
+        parse_values(args.speed_step),
+        parse_values(args.level_threshold),
+        parse_values(args.multiplier_step),
+    ))
+    ranked = tune(grid, args.bot, args.games, args.seed, args.target_survival,
+                  args.target_level_time, args.min_samples, args.cache, args.workers)
+
+    for score, params, stats in ranked[:args.top]:
+        settings = ', '.join(f"{name}={value:g}" for name, value in zip(PARAMETERS, params))
+        print(f"loss {score:.4f}  {settings}  median survival {stats['median_survival']:.1f}s")
+        for level, level_stats in stats['levels'].items():
+            median = level_stats['median_seconds']
+            median_text = f"{median:.1f}s" if median is not None else "-"
+            print(f"    level {level}: completed {level_stats['completed']}, "
+                  f"died {level_stats['died']}, median {median_text}")
+
+    if not args.dry_run:
+        best_loss, best_params, best_stats = ranked[0]
+        write_difficulty(best_params, best_stats, args.output, args.bot, args.games)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
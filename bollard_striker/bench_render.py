@@ -0,0 +1,88 @@
+"""
+Frame-time benchmark: Surface blit path vs. SDL2 texture path.
+
+Draws the gameplay scene (background, visitor, bollards, HUD) uncapped for a
+fixed number of frames with each renderer (the SDL2 one with vsync off) and
+prints frame-time statistics.  Each renderer runs in its own process so they
+don't share a window.
+
+    python bench_render.py --frames 2000 --bollards 5
+    SDL_VIDEODRIVER=dummy python bench_render.py      # headless, software renderer
+"""
+import argparse
+import multiprocessing
+import random
+import statistics
+import time
+
+SCREEN_SIZE = (800, 600)
+
+
+def run_backend(backend, frames, bollards, scale, results):
+    import pygame
+    from render import RenderPipeline
+    pygame.init()
+    if backend == 'sdl2':
+        from sdl2_backend import TextureRenderer
+        # No vsync: present() would sleep until the next refresh, and the surface path is uncapped
+        pipeline = TextureRenderer(SCREEN_SIZE, caption='bench', vsync=False)
+        name = 'sdl2 (gpu)' if pipeline.accelerated else 'sdl2 (software)'
+    else:
+        pipeline = RenderPipeline(SCREEN_SIZE, scale, caption='bench')
+        name = f'surface x{scale:g}'
+
+    pipeline.load_sprite('visitor', pygame.image.load('visitor.png'), (100, 100))
+    pipeline.load_sprite('bollard', pygame.image.load('bollard.png'), (50, 50))
+    font = pygame.font.SysFont("Arial", pipeline.font_size(36))
+
+    rng = random.Random(1)
+    positions = [[rng.randint(0, 750), rng.randint(-150, 600)] for _ in range(bollards)]
+    times = []
+    for frame in range(frames):
+        started = time.perf_counter()
+        pygame.event.pump()
+        pipeline.clear((44, 47, 51))
+        pipeline.draw_sprite('visitor', 350 + frame % 50, 450)
+        for position in positions:
+            position[1] = position[1] + 7 if position[1] < 600 else -100
+        pipeline.draw_sprites('bollard', positions)
+        pipeline.draw_text(font, f"Score: {frame // 30}", (255, 255, 255), 10, 10)
+        pipeline.draw_text(font, "Health: 3", (255, 215, 0), 10, 60)
+        pipeline.draw_text(font, "Level: 1", (57, 255, 20), 10, 110)
+        pipeline.fill_rect((192, 192, 192), (10, 149, 780, 2))
+        pipeline.present()
+        times.append(time.perf_counter() - started)
+    pygame.quit()
+
+    times.sort()
+    results.put({
+        'backend': name,
+        'mean_ms': statistics.mean(times) * 1000,
+        'p50_ms': times[len(times) // 2] * 1000,
+        'p95_ms': times[int(len(times) * 0.95)] * 1000,
+        'max_ms': times[-1] * 1000,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Surface and SDL2 texture frame times.")
+    parser.add_argument('--frames', type=int, default=2000)
+    parser.add_argument('--bollards', type=int, default=5)
+    parser.add_argument('--scales', default='1,0.5', help="render scales to try on the surface path")
+    args = parser.parse_args()
+
+    runs = [('surface', float(scale)) for scale in args.scales.split(',')] + [('sdl2', 1.0)]
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    print(f"{'renderer':<18}{'mean':>9}{'p50':>9}{'p95':>9}{'max':>9}   (ms per frame)")
+    for backend, scale in runs:
+        process = context.Process(target=run_backend, args=(backend, args.frames, args.bollards, scale, results))
+        process.start()
+        result = results.get()
+        process.join()
+        print(f"{result['backend']:<18}{result['mean_ms']:>9.3f}{result['p50_ms']:>9.3f}"
+              f"{result['p95_ms']:>9.3f}{result['max_ms']:>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
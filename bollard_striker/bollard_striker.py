@@ -1,10 +1,57 @@
 import pygame
 import random
+import sys
+import time
+import argparse
 import json
 import os
 import webbrowser
-import datetime
-import hashlib  # Import hashlib for hashing
+from leaderboard import load_leaderboard, update_leaderboard
+from simulation import DEFAULT_DIFFICULTY, LEFT, RIGHT
+from autopilot import Autopilot
+from render import PRESENT_BLIT, PRESENT_SCALED, RenderPipeline
+from profiler import FrameProfiler
+from input_latency import InputTracker
+from recorder import Recorder
+from leaderboard_view import HistoryRanking, LeaderboardView, ListRanking
+from global_leaderboard import GlobalLeaderboard
+from asset_host import ASSETS_ENV, SharedAssets
+from waves import WaveEngine, load_waves
+from collision import MaskCollider
+from quality import TIER_DIRTY_RECTS, TIER_NAMES, QualityGovernor, calibrate
+import game_state
+import telemetry
+
+# Command-line options (ignored when the game is imported by a tool)
+parser = argparse.ArgumentParser(description="WPAFB Gate Simulation - Avoid the Bollards")
+parser.add_argument('--autopilot', action='store_true', help="let the built-in autopilot play")
+parser.add_argument('--autopilot-budget', type=float, default=2.0, help="autopilot time budget per frame in ms")
+parser.add_argument('--renderer', choices=('surface', 'sdl2'), default='surface',
+                    help="draw with Surface blits or with SDL2 textures (falls back to SDL's software renderer)")
+parser.add_argument('--render-scale', type=float, default=1.0, help="internal gameplay resolution, e.g. 0.5 (surface renderer)")
+parser.add_argument('--fullscreen', action='store_true', help="fill the whole display")
+parser.add_argument('--present', choices=(PRESENT_SCALED, PRESENT_BLIT), default=PRESENT_SCALED,
+                    help="stretch with pygame.SCALED (GPU) or a single software scaled blit")
+parser.add_argument('--telemetry', metavar='DIR', help="write session telemetry to DIR")
+parser.add_argument('--profile', action='store_true', help="print frame-time statistics when a game ends")
+parser.add_argument('--low-latency', action='store_true',
+                    help="read input as late as possible before each frame is shown")
+parser.add_argument('--seed', type=int, help="play every game with the same bollard spawns (replays, benchmarks)")
+parser.add_argument('--record', metavar='DIR', help="record every game to DIR (surface renderer)")
+parser.add_argument('--record-every', type=int, default=1, metavar='N', help="record every Nth frame")
+parser.add_argument('--record-compress', action='store_true', help="zlib-compress recorded frames")
+parser.add_argument('--record-budget', type=float, default=1.0, metavar='MS',
+                    help="capture cost per frame before the recorder skips more frames")
+parser.add_argument('--leaderboard-url', default=os.environ.get('BOLLARD_LEADERBOARD_URL'),
+                    help="global leaderboard API (the web build's /api/leaderboard); Tab switches to it")
+parser.add_argument('--practice', action='store_true',
+                    help="retry a level from its start instead of ending the game, hold Backspace to rewind "
+                         "(Esc ends the game, scores aren't kept)")
+parser.add_argument('--assets', default=os.environ.get(ASSETS_ENV), metavar='NAME',
+                    help="use the decoded assets asset_host.py shares under NAME instead of loading the files")
+parser.add_argument('--quality', choices=('auto', '0', '1', '2', '3', '4'), default='auto',
+                    help="rendering quality tier, 0 (full) to 4 (lowest), or 'auto' to follow frame times")
+options = parser.parse_args(sys.argv[1:] if __name__ == '__main__' else [])
 
 # Initialize Pygame
 pygame.init()
@@ -57,22 +104,59 @@ LIGHT_BLUE = NAVIGATION_COLOR
 LIGHT_GREEN = INTERACTIVE_HIGHLIGHT
 GREY = SECONDARY_BACKGROUND
 
-# Create the window with caption
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption('WPAFB Gate Simulation - Avoid the Bollards')
+# Create the window with caption.  Menus draw on `screen` at 800x600, gameplay
+# draws through the pipeline (at the internal render scale, or as SDL2 textures).
+if options.renderer == 'sdl2':
+    from sdl2_backend import TextureRenderer
+    pipeline = TextureRenderer((SCREEN_WIDTH, SCREEN_HEIGHT), options.fullscreen,
+                               'WPAFB Gate Simulation - Avoid the Bollards')
+else:
+    pipeline = RenderPipeline((SCREEN_WIDTH, SCREEN_HEIGHT), options.render_scale, options.fullscreen,
+                              options.present, 'WPAFB Gate Simulation - Avoid the Bollards')
+screen = pipeline.ui
+
+# Assets decoded once by asset_host.py for every session on this machine (None: load the files)
+shared_assets = SharedAssets.attach(options.assets) if options.assets else None
 
 # Load images
+if shared_assets:
+    # Already at their drawn size, and used in place
+    visitor_image = shared_assets.surface('visitor')
+    bollard_image = shared_assets.surface('bollard')
+else:
+    try:
+        visitor_image = pygame.image.load('visitor.png')  # Replace with your image file
+        bollard_image = pygame.image.load('bollard.png')  # Replace with your image file
+    except pygame.error as e:
+        print(f"Error loading images: {e}")
+        pygame.quit()
+        exit()
+
+    # Resize images to fit the game (Visitor is larger now)
+    visitor_image = pygame.transform.scale(visitor_image, (100, 100))
+    bollard_image = pygame.transform.scale(bollard_image, (50, 50))
+
+# Pixel masks of the sprites at their drawn size, for collisions
+collider = MaskCollider(visitor_image, bollard_image)
+shared_table = shared_assets.collision_table(collider) if shared_assets else None
+if shared_table is not None:
+    collider.overlaps = shared_table  # Precomputed by the host
+else:
+    collider.precompute()
+
+# Hand the sprites to the render pipeline (pre-scaled surfaces or uploaded textures)
+pipeline.load_sprite('visitor', visitor_image, (100, 100))
+pipeline.load_sprite('bollard', bollard_image, (50, 50))
+
+# Particle effects for collisions and level-ups (they need NumPy; the game plays fine without them)
+COLLISION_SPARKS = (STRIKE_COLOR, ACCENT_PRIMARY, ACCENT_SECONDARY)
+LEVEL_UP_SPARKS = (INTERACTIVE_HIGHLIGHT, ACCENT_SECONDARY, TEXT_PRIMARY)
 try:
-    visitor_image = pygame.image.load('visitor.png')  # Replace with your image file
-    bollard_image = pygame.image.load('bollard.png')  # Replace with your image file
-except pygame.error as e:
-    print(f"Error loading images: {e}")
-    pygame.quit()
-    exit()
-
-# Resize images to fit the game (Visitor is larger now)
-visitor_image = pygame.transform.scale(visitor_image, (100, 100))
-bollard_image = pygame.transform.scale(bollard_image, (50, 50))
+    from particles import ParticleSystem
+    effects = ParticleSystem(background=PRIMARY_BACKGROUND)
+except ImportError as e:
+    print(f"Particle effects disabled: {e}")
+    effects = None
 
 # Fonts
 font = pygame.font.SysFont("Arial", 36)
@@ -81,12 +165,36 @@ title_font = pygame.font.SysFont("Arial", 48, bold=True)
 subtitle_font = pygame.font.SysFont("Arial", 36, bold=True)
 button_font = pygame.font.SysFont("Arial", 36)
 credit_font = pygame.font.SysFont("Arial", 20)
+row_font = pygame.font.SysFont("Arial", 24)
+hud_font = pygame.font.SysFont("Arial", pipeline.font_size(36))  # HUD is drawn at the internal resolution
 
-# Secret key for hashing (keep this secret!)
-SECRET_KEY = "your_very_secret_key"  # Define a secret key
+# Tuned difficulty file (written by autotune.py)
+DIFFICULTY_FILE = 'difficulty.json'
 
-# Leaderboard file
-LEADERBOARD_FILE = 'leaderboard.json'
+# Function to load the difficulty curve, falling back to the defaults
+def load_difficulty():
+    difficulty = dict(DEFAULT_DIFFICULTY)
+    if os.path.exists(DIFFICULTY_FILE):
+        try:
+            with open(DIFFICULTY_FILE, 'r') as f:
+                tuned = json.load(f)
+            if not isinstance(tuned, dict):
+                raise ValueError("not an object")
+            for key in DEFAULT_DIFFICULTY:
+                if key in tuned:
+                    value = tuned[key]
+                    # Numbers only (bool is an int, but not a difficulty), and a level needs points
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        raise ValueError(f"{key} is not a number")
+                    if key == 'level_threshold' and value <= 0:
+                        raise ValueError(f"{key} must be positive")
+                    difficulty[key] = value
+        except (json.JSONDecodeError, ValueError):
+            print("Difficulty file is empty or corrupted. Using default difficulty.")
+            difficulty = dict(DEFAULT_DIFFICULTY)
+    return difficulty
+
+difficulty = load_difficulty()
 
 # Visitor properties
 visitor_x = SCREEN_WIDTH // 2 - 50  # Centered horizontally (larger visitor)
@@ -99,27 +207,40 @@ score = 0
 
 # Initialize progression variables
 current_level = 1
-level_threshold = 10  # Points required to level up
+level_threshold = difficulty['level_threshold']  # Points required to level up
 score_multiplier = 1  # Multiplier based on level
 
 # Bollard properties
 bollard_width = 50
 bollard_height = 50
-bollard_speed = 7
-bollard_list = []
+bollard_speed = difficulty['bollard_speed']
+bollard_list = [[0, 0] for _ in range(5)]
+
+# Bollard spawns come from precomputed wave tables (patterns can be authored in waves.json)
+wave_patterns, wave_levels = load_waves()
+waves = WaveEngine(patterns=wave_patterns, levels=wave_levels)
 
-# Add initial bollards
-for _ in range(5):
-    x_pos = random.randint(0, SCREEN_WIDTH - bollard_width)
-    y_pos = random.randint(-150, -50)  # Start off-screen
-    bollard_list.append([x_pos, y_pos])
+# Global leaderboard from the web build's API, read through a disk cache (off without a URL)
+global_board = GlobalLeaderboard(options.leaderboard_url) if options.leaderboard_url else None
+
+# Practice mode keeps this many frames of snapshots for rewinding (about three seconds)
+REWIND_FRAMES = 180
+
+# Frame cap for gameplay (0 means uncapped) and how long the game over screen stays up
+FRAME_RATE = 60
+GAME_OVER_DELAY_MS = 3000
 
 # Load sounds
 try:
     pygame.mixer.init()
     pygame.mixer.music.load('sounds/background.mp3')  # Background music file
-    collision_sound = pygame.mixer.Sound('sounds/collision.mp3')  # Updated collision sound effect
-    click_sound = pygame.mixer.Sound('sounds/click.mp3')  # Updated button click sound effect
+    # Decoded sound effects from the asset host when it has them in this mixer's format
+    collision_sound = shared_assets.sound('collision') if shared_assets else None
+    click_sound = shared_assets.sound('click') if shared_assets else None
+    if collision_sound is None:
+        collision_sound = pygame.mixer.Sound('sounds/collision.mp3')  # Updated collision sound effect
+    if click_sound is None:
+        click_sound = pygame.mixer.Sound('sounds/click.mp3')  # Updated button click sound effect
     # Removed automatic music play to start silent
     # pygame.mixer.music.play(-1)  # Play background music in a loop
 except pygame.error as e:
@@ -131,34 +252,137 @@ except pygame.error as e:
 # Sound Control
 sound_enabled = False  # Sound is off by default
 
+# Autopilot replaces the keyboard when enabled
+autopilot = Autopilot(time_budget=options.autopilot_budget / 1000, collider=collider) if options.autopilot else None
+
+# Session telemetry (off unless --telemetry is given) and frame-time profiling
+session_telemetry = telemetry.Telemetry(options.telemetry) if options.telemetry else None
+profiler = FrameProfiler()
+FRAME_STATS_INTERVAL = 60  # Frames between telemetry frame-time reports
+
+# Input event filtering, frame pacing and input-to-flip latency (reported by the profiler)
+input_tracker = InputTracker(profiler, low_latency=options.low_latency)
+
+# Rendering quality: steps down (and back up) with measured frame times, unless --quality fixes a tier
+HUD_DIRTY_RECT = (0, 0, SCREEN_WIDTH // 2, 149)  # Where the HUD text can change
+
+# Function to apply a quality tier change: the render scale needs a new frame and HUD font
+def apply_quality(governor):
+    global screen, hud_font
+    scale = governor.render_scale(options.render_scale)
+    if options.renderer == 'surface' and scale != pipeline.scale:
+        try:
+            pipeline.set_scale(scale)
+        except pygame.error as e:
+            # No renderer for pygame.SCALED (e.g. no GPU): stretch with a software blit instead
+            print(f"Can't open a scaled window ({e}). Scaling with a software blit.")
+            pipeline.present_mode = PRESENT_BLIT
+            pipeline.set_scale(scale)
+        screen = pipeline.ui
+        hud_font = pygame.font.SysFont("Arial", pipeline.font_size(36))
+    if session_telemetry:
+        session_telemetry.emit(telemetry.QUALITY, governor.tier, governor.frame_rate(FRAME_RATE))
+
+# Dirty rects can't help when the frame is stretched or redrawn whole on every present
+governor = QualityGovernor(0 if options.quality == 'auto' else int(options.quality),
+                           adaptive=options.quality == 'auto', on_change=apply_quality,
+                           skip=() if pipeline.partial_present else (TIER_DIRTY_RECTS,))
+if governor.tier:
+    apply_quality(governor)
+
+# Function to start recording a game, if --record is on (the SDL2 renderer has no display surface to read)
+def start_recorder():
+    if not options.record:
+        return None
+    if pygame.display.get_surface() is None:
+        print("Recording needs the surface renderer. Not recording.")
+        return None
+    path = os.path.join(options.record, time.strftime("game-%Y%m%d-%H%M%S.bsrec"))
+    return Recorder(path, options.record_every, compress=options.record_compress,
+                    budget_ms=options.record_budget, frame_rate=FRAME_RATE)
+
+# Function to put the visitor, score and bollards back to the start of a game
+def reset_game():
+    global visitor_x, visitor_y, visitor_health, score, bollard_speed, current_level, score_multiplier
+    visitor_x = SCREEN_WIDTH // 2 - 50
+    visitor_y = SCREEN_HEIGHT - 150
+    visitor_health = 3
+    score = 0
+    current_level = 1
+    score_multiplier = 1
+    bollard_speed = difficulty['bollard_speed']
+    waves.reset(options.seed if options.seed is not None else random.randrange(2 ** 32))
+    waves.respawn_all(bollard_list)
+    if effects:
+        effects.clear()
+
+# Function to snapshot the game state (see game_state.py): returns bytes, or packs it into `buffer`
+def snapshot(buffer=None, offset=0):
+    return game_state.encode((visitor_x, visitor_y, visitor_health, score, score_multiplier, current_level,
+                              bollard_speed), waves, bollard_list, buffer, offset)
+
+# Function to go back to a snapshot
+def restore(data, offset=0):
+    global visitor_x, visitor_y, visitor_health, score, score_multiplier, current_level, bollard_speed
+    (visitor_x, visitor_y, visitor_health, score, score_multiplier, current_level,
+     bollard_speed) = game_state.decode(data, waves, bollard_list, offset)
+
+# Function to read pending input events.  Tools like soak.py replace it to inject input;
+# `screen_name` says which screen is asking ('landing', 'leaderboard', 'name_entry' or 'game').
+def poll_events(screen_name):
+    return input_tracker.poll(screen_name)
+
+# Function to show a finished frame.  Returns how long (s) present() waited for vsync,
+# which isn't work the quality governor should count.
+def present(surface=None, dirty=None):
+    started = time.perf_counter()
+    pipeline.present(surface, dirty)
+    input_tracker.presented()
+    return time.perf_counter() - started if pipeline.present_waits else 0.0
+
+# Function to list the logical rects a gameplay frame drew into (for dirty-rect presents)
+def frame_dirty_rects(bollard_list, visitor_x, visitor_y):
+    rects = [(x, y, bollard_width, bollard_height) for x, y in bollard_list]
+    rects.append((visitor_x, visitor_y, 100, 100))
+    rects.append(HUD_DIRTY_RECT)
+    particle_rect = effects.bounds() if effects else None
+    if particle_rect:
+        rects.append(particle_rect)
+    return rects
+
 # Function to draw visitor
 def draw_visitor(x, y):
-    screen.blit(visitor_image, (x, y))
+    pipeline.draw_sprite('visitor', x, y)
 
 # Function to draw bollards
 def draw_bollards(bollard_list):
-    for bollard in bollard_list:
-        screen.blit(bollard_image, (bollard[0], bollard[1]))
+    pipeline.draw_sprites('bollard', bollard_list)
 
 # Function to check for collisions
 def check_collision(bollard_list, visitor_x, visitor_y):
-    for bollard in bollard_list:
-        if (bollard[1] + bollard_height > visitor_y and
-            bollard[1] < visitor_y + 100 and
-            bollard[0] + bollard_width > visitor_x and
-            bollard[0] < visitor_x + 100):
-            if collision_sound:
-                collision_sound.play()
-            return True
+    if collider.hits(bollard_list, visitor_x, visitor_y):
+        if collision_sound:
+            collision_sound.play()
+        if effects:
+            # Sparks and debris off the front of the visitor
+            effects.burst(visitor_x + 50, visitor_y + 20, 160, COLLISION_SPARKS, speed=(2, 9), gravity=0.3)
+        return True
     return False
 
 # Function to increase difficulty based on score
 def increase_difficulty():
     global bollard_speed, current_level, score_multiplier
     if score >= level_threshold * current_level:
-        bollard_speed += 1  # Increase bollard speed every level_threshold points
+        bollard_speed += difficulty['speed_step']  # Increase bollard speed every level_threshold points
         current_level += 1   # Move to next level
-        score_multiplier += 0.5  # Increase score multiplier
+        score_multiplier += difficulty['multiplier_step']  # Increase score multiplier
+        waves.set_level(current_level)
+        if effects:
+            # A ring of sparks around the visitor
+            effects.burst(visitor_x + 50, visitor_y + 50, 240, LEVEL_UP_SPARKS, speed=(5, 6), life=(30, 45),
+                          gravity=-0.03)
+        if session_telemetry:
+            session_telemetry.emit(telemetry.LEVEL_UP, current_level, bollard_speed)
 
 # Update the Button Class for Better UI
 class Button:
@@ -177,17 +401,15 @@ class Button:
         pygame.draw.rect(surface, current_color, self.rect, border_radius=10)
         pygame.draw.rect(surface, METALLIC_SILVER, self.rect, width=4, border_radius=10)  # Thicker border for contrast
 
-        # Render text with shadow for better readability
+        # Render text with shadow for better readability (the shadow is the first thing dropped on a slow machine)
         text_surf = self.font.render(self.text, True, self.text_color)
-        shadow_surf = self.font.render(self.text, True, CARBON_BLACK)
-        shadow_offset = 2
-
-        # Position text and shadow
         text_rect = text_surf.get_rect(center=self.rect.center)
-        shadow_rect = shadow_surf.get_rect(center=(self.rect.centerx + shadow_offset, self.rect.centery + shadow_offset))
-
-        # Draw shadow first
-        surface.blit(shadow_surf, shadow_rect)
+        if governor.text_shadows:
+            shadow_surf = self.font.render(self.text, True, CARBON_BLACK)
+            shadow_offset = 2
+            shadow_rect = shadow_surf.get_rect(center=(self.rect.centerx + shadow_offset, self.rect.centery + shadow_offset))
+            # Draw shadow first
+            surface.blit(shadow_surf, shadow_rect)
         surface.blit(text_surf, text_rect)
 
     def is_hovered(self, mouse_pos):
@@ -206,7 +428,13 @@ def get_player_name():
     color_inactive = GREY
     color_active = BLUE
     color = color_inactive
+    composing = ''  # Text an IME is still composing, shown after the name
+    pygame.key.start_text_input()
+    pygame.key.set_text_input_rect(input_rect)
+    if session_telemetry:
+        session_telemetry.emit(telemetry.MENU, telemetry.MENU_NAME_ENTRY, telemetry.BUTTON_NONE)
     while input_active:
+        frame_started = time.perf_counter()
         screen.fill(WHITE)
         # Render prompt
         name_prompt = font.render("Enter your name:", True, BLACK)
@@ -214,17 +442,18 @@ def get_player_name():
         # Render input box
         pygame.draw.rect(screen, color, input_rect, 2)
         # Render current name
-        name_surf = font.render(player_name, True, BLACK)
+        name_surf = font.render(player_name + composing, True, BLACK)
         screen.blit(name_surf, (input_rect.x + 10, input_rect.y + 10))
-        pygame.display.flip()
+        vsync_wait = present(screen)
+        governor.record((time.perf_counter() - frame_started - vsync_wait) * 1000)
 
-        for event in pygame.event.get():
+        for event in poll_events('name_entry'):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 # If the user clicked on the input_box rect
-                if input_rect.collidepoint(event.pos):
+                if input_rect.collidepoint(pipeline.event_pos(event)):
                     color = color_active
                 else:
                     color = color_inactive
@@ -232,117 +461,133 @@ def get_player_name():
                 if event.key == pygame.K_RETURN:
                     if player_name.strip() != '':
                         input_active = False
-                elif event.key == pygame.K_BACKSPACE:
+                elif event.key == pygame.K_BACKSPACE and not composing:
                     player_name = player_name[:-1]
-                else:
-                    if len(player_name) < 20:  # Limit name length
-                        player_name += event.unicode
+            # Typed characters come as text, not keys, so IMEs and other layouts work too
+            elif event.type == pygame.TEXTEDITING:
+                composing = event.text
+            elif event.type == pygame.TEXTINPUT:
+                composing = ''
+                player_name = (player_name + event.text)[:20]  # Limit name length
     return player_name
 
-# Function to generate hash for the leaderboard data
-def generate_leaderboard_hash(data):
-    """
-    Generates a SHA-256 hash of the leaderboard data combined with a secret key.
-    """
-    hash_input = json.dumps(data, sort_keys=True) + SECRET_KEY
-    return hashlib.sha256(hash_input.encode()).hexdigest()
-
-# Function to update and save the leaderboard with hash
-def update_leaderboard(player_name, score, level):
-    leaderboard = []  # Initialize an empty leaderboard
-
-    # Check if the file exists and contains valid JSON
-    if os.path.exists(LEADERBOARD_FILE):
-        try:
-            with open(LEADERBOARD_FILE, 'r') as f:
-                leaderboard_data = json.load(f)
-                leaderboard = leaderboard_data.get('entries', [])
-        except json.JSONDecodeError:
-            print("Leaderboard file is empty or corrupted. Initializing new leaderboard.")
-
-    # Add the new score with additional details
-    leaderboard.append({
-        'name': player_name,
-        'score': score,
-        'level': level,
-        'date': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    })
-
-    # Sort the leaderboard by score in descending order and keep the top 5 scores
-    leaderboard = sorted(leaderboard, key=lambda x: x['score'], reverse=True)[:5]
-
-    # Generate hash for the leaderboard
-    leaderboard_hash = generate_leaderboard_hash(leaderboard)
-
-    # Save the updated leaderboard and its hash back to the file
-    with open(LEADERBOARD_FILE, 'w') as f:
-        json.dump({
-            'entries': leaderboard,
-            'hash': leaderboard_hash
-        }, f, indent=4)
-
-# Function to load and verify the leaderboard
-def load_leaderboard():
-    if os.path.exists(LEADERBOARD_FILE):
-        try:
-            with open(LEADERBOARD_FILE, 'r') as f:
-                leaderboard_data = json.load(f)
-                leaderboard = leaderboard_data.get('entries', [])
-                stored_hash = leaderboard_data.get('hash', '')
-                
-                # Verify the hash
-                computed_hash = generate_leaderboard_hash(leaderboard)
-                if stored_hash != computed_hash:
-                    print("Leaderboard data has been tampered with!")
-                    return []  # Return empty leaderboard or handle as desired
-                return leaderboard
-        except json.JSONDecodeError:
-            print("Leaderboard file is empty or corrupted. Initializing new leaderboard.")
-            return []
-    return []
-
-# Function to display the leaderboard with a Back button
+# Function to display the leaderboard with a Back button.  The list pages through the
+# whole score history (see leaderboard_view.py): scroll with the wheel or arrow/page keys,
+# type a name and press Enter to jump to that player's best rank.  With a global board
+# configured, Tab switches between this kiosk's history and the global board, which is
+# drawn from its cache at once and refreshed in the background (see global_leaderboard.py).
 def show_leaderboard():
     back_button = Button(
         rect=(SCREEN_WIDTH // 2 - 75, SCREEN_HEIGHT - 100, 150, 50),
         color=BUTTON_COLOR,
         text="Back"
     )
+
+    def make_view(ranking, fallback):
+        return LeaderboardView(ranking, fallback, row_font,
+                               rect=(20, 100, SCREEN_WIDTH - 40, 360), row_height=36,
+                               text_color=BLACK, highlight_color=ACCENT_PRIMARY, placeholder_color=DARK_GREY)
+
+    # What the global list was built from: the board's version, and whether current() had one
+    # to show (an expired cache only shows once a refresh has failed)
+    def global_shown():
+        return global_board.version, global_board.current() is not None
+
+    local_view = make_view(HistoryRanking(), lambda: ListRanking(load_leaderboard()))
+    view = local_view
+    global_view = None
+    global_built = None
+    if global_board:
+        global_board.refresh_if_stale()
+    search_text = ''
+    composing = ''  # Text an IME is still composing, shown after the search text
+    pygame.key.start_text_input()
+    scroll_keys = {pygame.K_UP: -1, pygame.K_DOWN: 1,
+                   pygame.K_PAGEUP: -view.visible_rows, pygame.K_PAGEDOWN: view.visible_rows}
+    if session_telemetry:
+        session_telemetry.emit(telemetry.MENU, telemetry.MENU_LEADERBOARD, telemetry.BUTTON_NONE)
     while True:
+        frame_started = time.perf_counter()
+        # Rebuild the global list when there's something new to show: a refresh brought a new
+        # board, or failed and left the expired one to show
+        if view is not local_view and global_shown() != global_built and global_board.current() is not None:
+            global_view.close()
+            global_view = view = make_view(ListRanking(global_board.current()), lambda: ListRanking([]))
+            global_built = global_shown()
+
         screen.fill(WHITE)
         # Render leaderboard title
-        leaderboard_title = font.render("Leaderboard", True, BLACK)
+        title = "Leaderboard" if view is local_view else "Global Leaderboard"
+        leaderboard_title = font.render(title, True, BLACK)
         screen.blit(leaderboard_title, (SCREEN_WIDTH // 2 - leaderboard_title.get_width() // 2, 50))
 
-        # Load leaderboard data
-        leaderboard = load_leaderboard()
+        # Display the visible part of the leaderboard
+        view.update()
+        view.draw(screen)
 
-        # Display leaderboard entries
-        y_offset = 150
-        for entry in leaderboard:
-            entry_text = font.render(f"{entry['name']} - Score: {entry['score']} - Level: {entry['level']} - {entry['date']}", True, BLACK)
-            screen.blit(entry_text, (SCREEN_WIDTH // 2 - entry_text.get_width() // 2, y_offset))
-            y_offset += 50
+        # Search box and position
+        search_surf = credit_font.render(f"Find player: {search_text}{composing}_", True, BLACK)
+        screen.blit(search_surf, (30, 465))
+        status = view.status()
+        if view is not local_view:
+            status = global_board.status() if global_board.current() is None else f"{status}, {global_board.status()}"
+        status_surf = credit_font.render(status, True, DARK_GREY)
+        screen.blit(status_surf, (SCREEN_WIDTH - 30 - status_surf.get_width(), 465))
 
         # Draw Back button
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = pipeline.mouse_pos()
         back_button.hovered = back_button.is_hovered(mouse_pos)
         back_button.draw(screen)
 
-        pygame.display.flip()
+        vsync_wait = present(screen)
+        governor.record((time.perf_counter() - frame_started - vsync_wait) * 1000)
 
-        for event in pygame.event.get():
+        for event in poll_events('leaderboard'):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
+            elif event.type == pygame.MOUSEWHEEL:
+                view.scroll(-event.y * 3)
+            elif event.type == pygame.KEYDOWN:
+                if event.key in scroll_keys:
+                    view.scroll(scroll_keys[event.key])
+                elif event.key == pygame.K_HOME:
+                    view.jump_to(1)
+                elif event.key == pygame.K_END:
+                    view.jump_to(view.total or 1)
+                elif event.key == pygame.K_RETURN:
+                    view.search(search_text)
+                elif event.key == pygame.K_TAB and global_board:
+                    if view is local_view:
+                        if global_view is None:
+                            global_view = make_view(ListRanking(global_board.current() or []), lambda: ListRanking([]))
+                            global_built = global_shown()
+                        view = global_view
+                        global_board.refresh_if_stale()
+                    else:
+                        view = local_view
+                elif event.key == pygame.K_BACKSPACE and not composing:
+                    search_text = search_text[:-1]
+            elif event.type == pygame.TEXTEDITING:
+                composing = event.text
+            elif event.type == pygame.TEXTINPUT:
+                composing = ''
+                search_text = (search_text + ''.join(char for char in event.text if char.isprintable()))[:20]
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                if back_button.is_clicked(mouse_pos):
+                if back_button.is_clicked(pipeline.event_pos(event)):
+                    if session_telemetry:
+                        session_telemetry.emit(telemetry.MENU, telemetry.MENU_LEADERBOARD, telemetry.BUTTON_BACK)
+                    local_view.close()
+                    if global_view:
+                        global_view.close()
                     return  # Return to the previous screen
 
 # Function to display Game Over screen and get player's name
 def show_game_over_screen(final_score):
     player_name = get_player_name()
     update_leaderboard(player_name, final_score, current_level)
+    if session_telemetry:
+        session_telemetry.emit(telemetry.MENU, telemetry.MENU_GAME_OVER, telemetry.BUTTON_NONE)
     screen.fill(WHITE)
     # Render texts
     game_over_text = game_over_font.render("GAME OVER", True, RED)
@@ -358,79 +603,153 @@ def show_game_over_screen(final_score):
     screen.blit(created_by_text, (SCREEN_WIDTH // 2 - created_by_text.get_width() // 2, SCREEN_HEIGHT // 2))
     screen.blit(fun_message_text, (SCREEN_WIDTH // 2 - fun_message_text.get_width() // 2, SCREEN_HEIGHT // 2 + 50))
 
-    pygame.display.flip()
-    pygame.time.delay(3000)  # Display the screen for 3 seconds before showing the leaderboard
+    pipeline.present(screen)
+    pygame.time.delay(GAME_OVER_DELAY_MS)  # Display the screen for 3 seconds before showing the leaderboard
     show_leaderboard()
 
 # Function to display game information (score, health, level)
 def display_game_info():
-    # Render score, health, and level
-    score_text = font.render(f"Score: {int(score * score_multiplier)}", True, TEXT_PRIMARY)
-    health_text = font.render(f"Health: {visitor_health}", True, CAUTION_YELLOW)
-    level_text = font.render(f"Level: {current_level}", True, NEON_GREEN)
-
-    # Blit the texts to the screen
-    screen.blit(score_text, (10, 10))
-    screen.blit(health_text, (10, 60))
-    screen.blit(level_text, (10, 110))
+    # Render score, health, and level (rendered text is cached by the pipeline)
+    pipeline.draw_text(hud_font, f"Score: {int(score * score_multiplier)}", TEXT_PRIMARY, 10, 10)
+    pipeline.draw_text(hud_font, f"Health: {visitor_health}", CAUTION_YELLOW, 10, 60)
+    pipeline.draw_text(hud_font, f"Level: {current_level}", NEON_GREEN, 10, 110)
 
     # Draw separators
     separator_color = METALLIC_SILVER
     separator_thickness = 2
-    pygame.draw.line(screen, separator_color, (10, 150), (SCREEN_WIDTH - 10, 150), separator_thickness)
+    pipeline.fill_rect(separator_color, (10, 149, SCREEN_WIDTH - 20, separator_thickness))
 
 # Main game loop
 def main_game():
     global visitor_x, visitor_y, visitor_health, score, bollard_speed, current_level, score_multiplier
     running = True
-    clock = pygame.time.Clock()
-
+    reset_game()
+    recorder = start_recorder()
+    if session_telemetry:
+        session_telemetry.emit(telemetry.GAME_START, visitor_health, bollard_speed)
+
+    previous_dirty = None  # Rects drawn last frame, once presents are dirty-rect only
+    # Practice mode: a checkpoint at the start of each level reached and the last few seconds of snapshots
+    checkpoints = [(current_level, snapshot())] if options.practice else None
+    rewind = game_state.RewindBuffer(REWIND_FRAMES) if options.practice else None
+    frame_started = time.perf_counter()
     while running:
-        screen.fill(PRIMARY_BACKGROUND)  # Updated background color
+        frame_rate = governor.frame_rate(FRAME_RATE)
+        pipeline.clear(PRIMARY_BACKGROUND)  # Updated background color
+
+        # Practice mode: holding Backspace plays the last few seconds backwards
+        rewinding = bool(rewind and rewind.count and pygame.key.get_pressed()[pygame.K_BACKSPACE])
+        if rewinding:
+            restore(rewind.buffer, rewind.pop())
+            while checkpoints[-1][0] > current_level:
+                checkpoints.pop()  # Rewound to before that level started: its start is retaken on the way back
+        elif rewind:
+            if current_level > checkpoints[-1][0]:
+                checkpoints.append((current_level, snapshot()))
+            snapshot(rewind.buffer, rewind.push())
+
+        # The autopilot plans from the bollards as they were drawn last frame, before they move
+        # (like SimGame.step(), whose moves it predicts); the keyboard is read later, as late as possible
+        if autopilot and not rewinding:
+            move = autopilot.decide(visitor_x, visitor_y, bollard_list, bollard_speed)
+
+        # Update bollard positions
+        if not rewinding:
+            waves.advance(bollard_speed)
+            for bollard in bollard_list:
+                bollard[1] += bollard_speed
+                # If a bollard goes off-screen, respawn it from the wave table
+                if bollard[1] > SCREEN_HEIGHT:
+                    bollard[0], bollard[1] = waves.spawn()
+                    score += 1 * score_multiplier  # Increase score with multiplier
+                    increase_difficulty()         # Adjust difficulty based on new score
+
+        # Low-latency mode sleeps here, so input is read just in time for the flip
+        input_tracker.before_input(frame_rate)
 
         # Event handling
-        for event in pygame.event.get():
+        for event in poll_events('game'):
             if event.type == pygame.QUIT:
+                if recorder:
+                    recorder.close()  # Write out the queued frames before the process goes
                 pygame.quit()
                 exit()
-
-        # Get key presses for movement
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_LEFT] and visitor_x > 0:
-            visitor_x -= visitor_speed
-        if keys[pygame.K_RIGHT] and visitor_x < SCREEN_WIDTH - 100:
-            visitor_x += visitor_speed
-
-        # Update bollard positions
-        for bollard in bollard_list:
-            bollard[1] += bollard_speed
-            # If a bollard goes off-screen, reset it
-            if bollard[1] > SCREEN_HEIGHT:
-                bollard[1] = random.randint(-150, -50)
-                bollard[0] = random.randint(0, SCREEN_WIDTH - bollard_width)
-                score += 1 * score_multiplier  # Increase score with multiplier
-                increase_difficulty()         # Adjust difficulty based on new score
-
-        # Draw visitor and bollards
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE and options.practice and running:
+                if session_telemetry:
+                    session_telemetry.emit(telemetry.GAME_END, int(score * score_multiplier), current_level)
+                if recorder:
+                    recorder.close()
+                running = False  # Practice games end here, without a score
+
+        # Get key presses for movement (or ask the autopilot)
+        if rewinding:
+            pass
+        elif autopilot:
+            if move == LEFT and visitor_x > 0:
+                visitor_x -= visitor_speed
+            elif move == RIGHT and visitor_x < SCREEN_WIDTH - 100:
+                visitor_x += visitor_speed
+        else:
+            keys = pygame.key.get_pressed()
+            if keys[pygame.K_LEFT] and visitor_x > 0:
+                visitor_x -= visitor_speed
+            if keys[pygame.K_RIGHT] and visitor_x < SCREEN_WIDTH - 100:
+                visitor_x += visitor_speed
+
+        # Draw visitor and bollards, and the effects on top
         draw_visitor(visitor_x, visitor_y)
         draw_bollards(bollard_list)
+        if effects:
+            effects.step()
+            pipeline.draw_particles(effects)
+        dirty = frame_dirty_rects(bollard_list, visitor_x, visitor_y) if governor.dirty_rects else None
 
         # Check for collisions
         if check_collision(bollard_list, visitor_x, visitor_y):
             visitor_health -= 1
+            if session_telemetry:
+                session_telemetry.emit(telemetry.COLLISION, visitor_health, int(score * score_multiplier))
             # Reset bollard positions after collision
-            for bollard in bollard_list:
-                bollard[1] = random.randint(-150, -50)
-                bollard[0] = random.randint(0, SCREEN_WIDTH - bollard_width)
-            if visitor_health <= 0:
+            waves.respawn_all(bollard_list)
+            if visitor_health <= 0 and checkpoints:
+                restore(checkpoints[-1][1])  # Practice mode: retry the level from its start
+                rewind.clear()
+            elif visitor_health <= 0:
+                if session_telemetry:
+                    session_telemetry.emit(telemetry.GAME_END, int(score * score_multiplier), current_level)
+                if options.autopilot:
+                    print(autopilot.report())
+                if options.profile:
+                    print(profiler.report())
+                    print(governor.report())
+                if recorder:
+                    recorder.close()
+                    print(recorder.report())
                 show_game_over_screen(int(score * score_multiplier))
                 running = False
 
         # Display game info (score, health, level)
         display_game_info()
 
-        pygame.display.flip()
-        clock.tick(60)
+        # Present: whole frame, or only what changed since the last one (this frame's and last frame's rects)
+        vsync_wait = present(dirty=previous_dirty + dirty if dirty and previous_dirty else None)
+        previous_dirty = dirty
+        if recorder and running:
+            recorder.capture(pygame.display.get_surface())
+        input_tracker.end_frame(frame_rate)  # Frame cap
+
+        # Frame timing (the game over screens ran inside the last frame, so skip it)
+        frame_ended = time.perf_counter()
+        if running:
+            frame_ms = (frame_ended - frame_started) * 1000
+            work_ms = frame_ms - input_tracker.frame_wait * 1000
+            profiler.record(frame_ms, work_ms)
+            if governor.record(work_ms - vsync_wait * 1000):
+                previous_dirty = None  # The display may have been reopened; show the next frame whole
+            if session_telemetry and profiler.count % FRAME_STATS_INTERVAL == 0:
+                mean_ms, max_ms = profiler.take_interval()
+                session_telemetry.emit(telemetry.FRAME_STATS, int(mean_ms * 1000), int(max_ms * 1000))
+        frame_started = frame_ended
 
 # Function to display the landing page with enhanced styling
 def show_landing_page():
@@ -453,7 +772,10 @@ def show_landing_page():
     )
 
     waiting = True
+    if session_telemetry:
+        session_telemetry.emit(telemetry.MENU, telemetry.MENU_LANDING, telemetry.BUTTON_NONE)
     while waiting:
+        frame_started = time.perf_counter()
         screen.fill(PRIMARY_BACKGROUND)
 
         # Render texts
@@ -479,7 +801,7 @@ def show_landing_page():
         toggle_sound_button.text = "Sound: On" if sound_enabled else "Sound: Off"
 
         # Draw buttons
-        mouse_pos = pygame.mouse.get_pos()
+        mouse_pos = pipeline.mouse_pos()
         start_button.hovered = start_button.is_hovered(mouse_pos)
         leaderboard_button.hovered = leaderboard_button.is_hovered(mouse_pos)
         toggle_sound_button.hovered = toggle_sound_button.is_hovered(mouse_pos)
@@ -492,20 +814,28 @@ def show_landing_page():
         screen.blit(repo_text, (repo_rect.x + 10, repo_rect.y))  # Add padding to text position
         pygame.draw.rect(screen, METALLIC_SILVER, repo_rect, 1)  # Draw box around link
 
-        pygame.display.flip()
+        vsync_wait = present(screen)
+        governor.record((time.perf_counter() - frame_started - vsync_wait) * 1000)
 
-        for event in pygame.event.get():
+        for event in poll_events('landing'):
             if event.type == pygame.QUIT:
                 pygame.quit()
                 exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
-                if start_button.is_clicked(mouse_pos):
+                click_pos = pipeline.event_pos(event)
+                if start_button.is_clicked(click_pos):
+                    if session_telemetry:
+                        session_telemetry.emit(telemetry.MENU, telemetry.MENU_LANDING, telemetry.BUTTON_START)
                     if sound_enabled:
                         pygame.mixer.music.play(-1)
                     waiting = False
-                elif leaderboard_button.is_clicked(mouse_pos):
+                elif leaderboard_button.is_clicked(click_pos):
+                    if session_telemetry:
+                        session_telemetry.emit(telemetry.MENU, telemetry.MENU_LANDING, telemetry.BUTTON_LEADERBOARD)
                     show_leaderboard()
-                elif toggle_sound_button.is_clicked(mouse_pos):
+                elif toggle_sound_button.is_clicked(click_pos):
+                    if session_telemetry:
+                        session_telemetry.emit(telemetry.MENU, telemetry.MENU_LANDING, telemetry.BUTTON_SOUND)
                     sound_enabled = not sound_enabled
                     toggle_sound_button.text = "Sound: On" if sound_enabled else "Sound: Off"
                     if sound_enabled:
@@ -513,12 +843,38 @@ def show_landing_page():
                     else:
                         pygame.mixer.music.pause()
                 # Detecting click on the GitHub link
-                if repo_rect.collidepoint(mouse_pos):
+                if repo_rect.collidepoint(click_pos):
+                    if session_telemetry:
+                        session_telemetry.emit(telemetry.MENU, telemetry.MENU_LANDING, telemetry.BUTTON_GITHUB)
                     webbrowser.open("https://github.com/lordbuffcloud/bollard_striker")
 
-# Start the game by showing the landing page
-show_landing_page()
-main_game()
+# Function to pick the starting quality tier: a few frames of gameplay and a menu button at each tier
+def calibrate_quality():
+    sample_bollards = [[50 + 150 * index, 100 * index - 50] for index in range(len(bollard_list))]
+    sample_button = Button(rect=(SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT // 2 - 100, 300, 80),
+                           color=BUTTON_COLOR, text="Start")
+
+    def draw_frame():
+        pipeline.clear(PRIMARY_BACKGROUND)
+        draw_visitor(visitor_x, visitor_y)
+        draw_bollards(sample_bollards)
+        display_game_info()
+        sample_button.draw(screen)
+        dirty = frame_dirty_rects(sample_bollards, visitor_x, visitor_y) if governor.dirty_rects else None
+        return present(dirty=dirty)
+
+    medians = calibrate(governor, draw_frame)
+    if governor.tier:
+        print(f"Quality: a full-quality frame takes {medians[0]:.1f} ms, "
+              f"starting at tier {governor.tier} ({TIER_NAMES[governor.tier]})")
+
+if __name__ == '__main__':
+    if options.quality == 'auto':
+        calibrate_quality()
 
-# Quit the game
-pygame.quit()
+    # Start the game by showing the landing page
+    show_landing_page()
+    main_game()
+
+    # Quit the game
+    pygame.quit()
@@ -0,0 +1,168 @@
+"""
+Pixel-accurate collisions between the visitor and the bollards.
+
+The sprites have transparent corners, so the old box test counted hits
+that didn't touch anything.  A MaskCollider builds one pygame.mask.Mask per
+sprite, from the images at the size they are drawn.  Each frame it runs the
+same cheap box test as before.  Only a box overlap goes on to the masks.
+
+Whether two fixed masks overlap depends only on the offset between them.
+The box test leaves (100 + 50 - 1)^2 possible offsets, so each answer is
+kept in a bytearray indexed by offset: a mask test runs once per offset,
+and after that a hit check is a box test plus one lookup.
+
+The game, the headless simulation and the autopilot all use the same
+table, so tuning and lookahead see the hits players get.  default_collider()
+builds it once per process from the sprite files.
+
+    python collision.py bench
+"""
+import os
+import time
+
+import pygame
+
+UNKNOWN = 0
+MISS = 1
+HIT = 2
+
+# Sprite files and the size they are drawn at (same as bollard_striker.py)
+VISITOR_IMAGE = ('visitor.png', (100, 100))
+BOLLARD_IMAGE = ('bollard.png', (50, 50))
+
+
+class MaskCollider:
+    def __init__(self, visitor_image, bollard_image):
+        self.visitor_mask = pygame.mask.from_surface(visitor_image)
+        self.bollard_mask = pygame.mask.from_surface(bollard_image)
+        self.visitor_w, self.visitor_h = visitor_image.get_size()
+        self.bollard_w, self.bollard_h = bollard_image.get_size()
+        self.sizes = (self.bollard_w, self.bollard_h, self.visitor_w, self.visitor_h)
+        # Offsets (bollard - visitor) that pass the box test: -bollard_w < dx < visitor_w, same for dy
+        self.columns = self.visitor_w + self.bollard_w - 1
+        self.overlaps = bytearray(self.columns * (self.visitor_h + self.bollard_h - 1))
+        self.spans = {}  # dy -> runs of hitting dx, for the autopilot
+
+    def __deepcopy__(self, memo):
+        return self  # Depends only on the sprites, so copies of a game share it
+
+    def overlap_at(self, dx, dy):
+        """Whether the masks overlap with the bollard at (dx, dy) from the visitor, cached per offset."""
+        index = (dy + self.bollard_h - 1) * self.columns + dx + self.bollard_w - 1
+        known = self.overlaps[index]
+        if known == UNKNOWN:
+            known = HIT if self.visitor_mask.overlap(self.bollard_mask, (dx, dy)) else MISS
+            self.overlaps[index] = known
+        return known == HIT
+
+    def precompute(self):
+        """Fills in every offset up front (about 10 ms), instead of on first use."""
+        for dy in range(1 - self.bollard_h, self.visitor_h):
+            for dx in range(1 - self.bollard_w, self.visitor_w):
+                self.overlap_at(dx, dy)
+
+    def hit_spans(self, dy):
+        """The (first, last) runs of dx at which a bollard `dy` below the visitor hits it."""
+        spans = self.spans.get(dy)
+        if spans is None:
+            spans = []
+            if -self.bollard_h < dy < self.visitor_h:
+                start = None
+                for dx in range(1 - self.bollard_w, self.visitor_w + 1):
+                    hit = dx < self.visitor_w and self.overlap_at(dx, dy)
+                    if hit and start is None:
+                        start = dx
+                    elif not hit and start is not None:
+                        spans.append((start, dx - 1))
+                        start = None
+            self.spans[dy] = spans
+        return spans
+
+    def hits(self, bollard_list, visitor_x, visitor_y):
+        """True if any bollard touches the visitor."""
+        # Box test: where a bollard's top-left corner can be and still overlap the visitor's box
+        bollard_w, bollard_h, visitor_w, visitor_h = self.sizes
+        top = visitor_y - bollard_h
+        bottom = visitor_y + visitor_h
+        left = visitor_x - bollard_w
+        right = visitor_x + visitor_w
+        for bollard in bollard_list:
+            if top < bollard[1] < bottom and left < bollard[0] < right:
+                if self.overlap_at(int(bollard[0] - visitor_x), int(bollard[1] - visitor_y)):
+                    return True
+        return False
+
+
+_default = None
+
+
+def default_collider():
+    """A collider for the game's own sprites, built and precomputed on first use."""
+    global _default
+    if _default is None:
+        here = os.path.dirname(os.path.abspath(__file__))
+        images = [pygame.transform.scale(pygame.image.load(os.path.join(here, path)), size)
+                  for path, size in (VISITOR_IMAGE, BOLLARD_IMAGE)]
+        _default = MaskCollider(*images)
+        _default.precompute()
+    return _default
+
+
+def bench(frames=200_000):
+    import os
+    import random
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    visitor = pygame.transform.scale(pygame.image.load('visitor.png'), (100, 100))
+    bollard = pygame.transform.scale(pygame.image.load('bollard.png'), (50, 50))
+    collider = MaskCollider(visitor, bollard)
+    started = time.perf_counter()
+    collider.precompute()
+    precompute_ms = (time.perf_counter() - started) * 1000
+
+    # Frames like the game's: five bollards anywhere on their way down, the visitor near the bottom
+    rng = random.Random(1)
+    scenes = [([[rng.randint(0, 750), rng.randint(-150, 600)] for _ in range(5)], rng.randint(0, 700), 450)
+              for _ in range(1000)]
+
+    def box_test(bollard_list, visitor_x, visitor_y):
+        for bollard in bollard_list:
+            if (bollard[1] + 50 > visitor_y and bollard[1] < visitor_y + 100 and
+                    bollard[0] + 50 > visitor_x and bollard[0] < visitor_x + 100):
+                return True
+        return False
+
+    def uncached(bollard_list, visitor_x, visitor_y):
+        for bollard in bollard_list:
+            dx = int(bollard[0] - visitor_x)
+            dy = int(bollard[1] - visitor_y)
+            if -50 < dx < 100 and -50 < dy < 100 and collider.visitor_mask.overlap(collider.bollard_mask, (dx, dy)):
+                return True
+        return False
+
+    # Most frames have no collision at all (a hit resets the bollards), so time those on their own too
+    misses = [scene for scene in scenes if not box_test(*scene)]
+    results = {}
+    for name, test in (('box', box_test), ('mask, cached offsets', collider.hits), ('mask, uncached', uncached)):
+        timings = []
+        for scene_set in (scenes, misses):
+            hits = 0
+            started = time.perf_counter()
+            for frame in range(frames):
+                bollard_list, visitor_x, visitor_y = scene_set[frame % len(scene_set)]
+                hits += test(bollard_list, visitor_x, visitor_y)
+            timings.append(((time.perf_counter() - started) / frames * 1e9, hits))
+        results[name] = timings
+
+    box_all, box_clear = results['box'][0][0], results['box'][1][0]
+    print(f"offset table: {len(collider.overlaps)} offsets precomputed in {precompute_ms:.0f} ms")
+    print(f"{'':<22} {'all frames':>28}   {'frames clear of the box':>28}")
+    for name, ((all_ns, hits), (clear_ns, _)) in results.items():
+        print(f"{name:<22} {all_ns:7.0f} ns ({all_ns / box_all - 1:+6.1%}), {hits / frames:5.1%} hit   "
+              f"{clear_ns:7.0f} ns ({clear_ns / box_clear - 1:+6.1%})")
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:] == ['bench']:
+        bench()
+    else:
+        print("usage: python collision.py bench")
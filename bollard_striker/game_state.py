@@ -0,0 +1,169 @@
+"""
+Game-state snapshots in a fixed binary layout.
+
+A snapshot is everything the next frame depends on: visitor position and
+health, score, multiplier, level and bollard speed, the wave engine's cursor
+(its random numbers come from per-level tables, so seed, level and cursor are
+the whole RNG state) and every bollard position.  It's packed with one
+struct call into a few hundred bytes, so taking one is about as cheap as
+copying them, and restoring one is a single unpack.
+
+    checkpoint = game.snapshot()          # bytes
+    game.restore(checkpoint)              # back to that frame
+
+RewindBuffer keeps the last N snapshots in one preallocated bytearray:
+snapshots are packed straight into its slots (struct.pack_into), nothing is
+allocated per frame.  The game uses it for practice mode (retry a level
+from its start, hold Backspace to rewind); SimGame.snapshot()/restore() let
+search-based bots branch from a state and come back to it.
+
+    python game_state.py bench
+"""
+import struct
+
+BOLLARD_COUNT = 5
+
+# visitor x, y, health, score, multiplier, level, bollard speed
+GAME_FORMAT = 'iibddHd'
+# wave engine: seed, level, table level, distance, cursor, spawned, row position, recent track positions
+WAVES_FORMAT = 'qHHdHQd' + 'd' * BOLLARD_COUNT
+# each bollard: x, y
+BOLLARD_FORMAT = 'hd'
+
+GAME_FIELDS = len(GAME_FORMAT)
+WAVES_FIELDS = 7 + BOLLARD_COUNT
+
+_layouts = {}
+
+
+def layout(bollard_count=BOLLARD_COUNT):
+    """The struct for a game with `bollard_count` bollards."""
+    state = _layouts.get(bollard_count)
+    if state is None:
+        state = _layouts[bollard_count] = struct.Struct('<' + GAME_FORMAT + WAVES_FORMAT +
+                                                        BOLLARD_FORMAT * bollard_count)
+    return state
+
+
+STATE = layout()
+
+
+def encode(values, waves, bollard_list, buffer=None, offset=0):
+    """Packs a state: `values` are (visitor_x, visitor_y, visitor_health, score,
+    score_multiplier, current_level, bollard_speed).  Returns bytes, or packs into
+    `buffer` at `offset` when one is given."""
+    if len(bollard_list) == BOLLARD_COUNT:
+        # The game's case, spelled out: one pack call and no temporary list
+        (x0, y0), (x1, y1), (x2, y2), (x3, y3), (x4, y4) = bollard_list
+        if buffer is None:
+            return STATE.pack(*values, *waves.state(), x0, y0, x1, y1, x2, y2, x3, y3, x4, y4)
+        STATE.pack_into(buffer, offset, *values, *waves.state(), x0, y0, x1, y1, x2, y2, x3, y3, x4, y4)
+        return None
+    flat = [value for bollard in bollard_list for value in bollard]
+    if buffer is None:
+        return layout(len(bollard_list)).pack(*values, *waves.state(), *flat)
+    layout(len(bollard_list)).pack_into(buffer, offset, *values, *waves.state(), *flat)
+    return None
+
+
+def decode(data, waves, bollard_list, offset=0):
+    """Unpacks a state: puts the wave engine and the bollards (in place) back and
+    returns the game values in the order encode() takes them."""
+    state = STATE if len(bollard_list) == BOLLARD_COUNT else layout(len(bollard_list))
+    fields = state.unpack_from(data, offset)
+    waves.set_state(*fields[GAME_FIELDS:GAME_FIELDS + WAVES_FIELDS])
+    index = GAME_FIELDS + WAVES_FIELDS
+    for bollard in bollard_list:
+        bollard[0] = fields[index]
+        bollard[1] = fields[index + 1]
+        index += 2
+    return fields[:GAME_FIELDS]
+
+
+class RewindBuffer:
+    """The last `capacity` snapshots, newest on top, in one preallocated bytearray."""
+
+    def __init__(self, capacity, size=STATE.size):
+        self.capacity = capacity
+        self.size = size
+        self.buffer = bytearray(capacity * size)
+        self.head = 0   # Slot the next snapshot goes into
+        self.count = 0  # Snapshots held
+
+    def push(self):
+        """Offset of the slot for a new snapshot; overwrites the oldest one when full."""
+        offset = self.head * self.size
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+        return offset
+
+    def pop(self):
+        """Offset of the newest snapshot, which is taken off the buffer (None when empty)."""
+        if not self.count:
+            return None
+        self.count -= 1
+        self.head = (self.head - 1) % self.capacity
+        return self.head * self.size
+
+    def clear(self):
+        self.head = 0
+        self.count = 0
+
+
+def bench(rounds=200_000):
+    import copy
+    import time
+    from simulation import SimGame, STAY
+
+    def timed(function, *args, repeat=rounds):
+        # Best of five runs, so a busy machine doesn't decide the result
+        best = None
+        for _ in range(5):
+            started = time.perf_counter()
+            for _ in range(max(1, repeat // 5)):
+                function(*args)
+            elapsed = (time.perf_counter() - started) / max(1, repeat // 5)
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1e9
+
+    game = SimGame(seed=1)
+    for _ in range(500):
+        game.step(STAY)
+    data = game.snapshot()
+    ring = RewindBuffer(180)
+
+    def into_ring():
+        game.snapshot(ring.buffer, ring.push())
+
+    rows = [('snapshot() to bytes', timed(game.snapshot)),
+            ('snapshot() into rewind ring', timed(into_ring)),
+            ('restore()', timed(game.restore, data))]
+    bollards = len(game.bollard_list)
+    print(f"state: {STATE.size} bytes for {bollards} bollards")
+    for name, ns in rows:
+        print(f"{name:<28} {ns:6.0f} ns ({ns / bollards:.0f} ns per bollard)")
+
+    # What each extra bollard costs, from a game with ten times as many
+    many = [[100 * (index % 7), -index] for index in range(bollards * 10)]
+    values = (game.visitor_x, game.visitor_y, game.visitor_health, game.score, game.score_multiplier,
+              game.current_level, game.bollard_speed)
+    few_ns = timed(encode, values, game.waves, game.bollard_list)
+    many_ns = timed(encode, values, game.waves, many)
+    print(f"marginal cost: {(many_ns - few_ns) / (len(many) - bollards):.0f} ns per extra bollard")
+    deep_ns = timed(copy.deepcopy, game, repeat=max(1, rounds // 100))
+    print(f"copy.deepcopy(SimGame) for comparison: {deep_ns:.0f} ns")
+
+    # Branching: a restored game plays on exactly like the original
+    first = [game.step(STAY) or (game.score, tuple(map(tuple, game.bollard_list))) for _ in range(300)]
+    game.restore(data)
+    second = [game.step(STAY) or (game.score, tuple(map(tuple, game.bollard_list))) for _ in range(300)]
+    print(f"restore, replay 300 frames, same result: {first == second}")
+
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:] == ['bench']:
+        bench()
+    else:
+        print("usage: python game_state.py bench")
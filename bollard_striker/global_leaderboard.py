@@ -0,0 +1,304 @@
+"""
+Global leaderboard: the web build's /api/leaderboard, read through a disk cache.
+
+The board is kept in global_leaderboard_cache.json along with the ETag and
+Last-Modified the server sent.  Refreshing is a conditional GET
+(If-None-Match / If-Modified-Since) on one keep-alive connection, so a
+board that hasn't changed costs a 304 with no body.
+
+Cached copies are used like HTTP's stale-while-revalidate:
+
+    fresh      younger than `ttl`: shown, no request
+    stale      up to `stale_ttl` past that: shown at once, refreshed in the background
+    expired    older still: refreshed first, and shown only if the refresh fails
+
+Refreshes run on a background thread, so the leaderboard screen draws from
+whatever is cached and picks the new board up when it arrives (`version`
+goes up).
+
+A stand-in for the API, serving a JSON file with ETag and Last-Modified,
+for trying the client without the web deployment:
+
+    python global_leaderboard.py serve board.json --port 8766
+    python global_leaderboard.py fetch http://localhost:8766/api/leaderboard --repeat 3
+    python bollard_striker.py --leaderboard-url http://localhost:8766/api/leaderboard
+"""
+import argparse
+import email.utils
+import hashlib
+import http.client
+import json
+import os
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CACHE_FILE = 'global_leaderboard_cache.json'
+CACHE_TTL = 60                # Seconds a fetched board counts as fresh
+STALE_TTL = 24 * 60 * 60      # Seconds after that it may still be shown while revalidating
+REQUEST_TIMEOUT = 5
+
+FRESH = 'fresh'
+STALE = 'stale'
+EXPIRED = 'expired'
+MISSING = 'missing'
+
+
+def clean_entries(entries):
+    """Entries in leaderboard.json's shape, dropping anything without a name and a numeric score."""
+    cleaned = []
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict) or not isinstance(entry.get('name'), str):
+            continue
+        try:
+            score = int(float(entry.get('score')))
+            level = int(float(entry.get('level', 1)))
+        except (TypeError, ValueError):
+            continue
+        cleaned.append({'name': entry['name'], 'score': score, 'level': level, 'date': str(entry.get('date', ''))})
+    return cleaned
+
+
+def describe_age(seconds):
+    if seconds < 60:
+        return "just now"
+    if seconds < 3600:
+        return f"{int(seconds // 60)} min ago"
+    if seconds < 86400:
+        return f"{int(seconds // 3600)} h ago"
+    return f"{int(seconds // 86400)} days ago"
+
+
+class GlobalLeaderboard:
+    def __init__(self, url, cache_path=CACHE_FILE, ttl=CACHE_TTL, stale_ttl=STALE_TTL, timeout=REQUEST_TIMEOUT):
+        parsed = urllib.parse.urlparse(url)
+        self.url = url
+        self.host = parsed.netloc
+        self.https = parsed.scheme == 'https'
+        self.path = (parsed.path or '/') + (f"?{parsed.query}" if parsed.query else '')
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.timeout = timeout
+        self.connection = None    # Keep-alive connection, only used by the refreshing thread
+        self.lock = threading.Lock()
+        self.thread = None
+        self.error = None         # Why the last refresh failed, None if it worked
+        self.last_status = None   # HTTP status of the last refresh (200 or 304)
+        self.version = 0          # Goes up whenever a new board arrives
+        self.cache = self.load_cache()
+
+    # Disk cache
+    def load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            print("Global leaderboard cache is empty or corrupted. Fetching a new copy.")
+            return None
+        if not isinstance(cache, dict) or cache.get('url') != self.url:
+            return None  # Another server's board
+        cache['entries'] = clean_entries(cache.get('entries'))
+        return cache
+
+    def save_cache(self, cache):
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def state(self, now=None):
+        cache = self.cache
+        if cache is None:
+            return MISSING
+        age = (time.time() if now is None else now) - cache.get('fetched_at', 0)
+        if age < self.ttl:
+            return FRESH
+        if age < self.ttl + self.stale_ttl:
+            return STALE
+        return EXPIRED
+
+    def current(self):
+        """The board to show right now, or None while there's nothing usable yet."""
+        cache = self.cache
+        state = self.state()
+        if state in (FRESH, STALE):
+            return cache['entries']
+        if state == EXPIRED and self.error is not None:
+            return cache['entries']  # Offline: an old board beats none
+        return None
+
+    def status(self):
+        """One line about where the shown board came from."""
+        cache = self.cache
+        refreshing = self.thread is not None and self.thread.is_alive()
+        if cache is None:
+            if refreshing:
+                return "Loading global board..."
+            return f"Global board unavailable ({self.error})" if self.error else "Global board not loaded"
+        updated = f"updated {describe_age(time.time() - cache.get('fetched_at', 0))}"
+        if refreshing:
+            return f"{updated}, refreshing..."
+        if self.error:
+            return f"offline, {updated}"
+        return updated
+
+    # Refreshing
+    def refresh_if_stale(self):
+        """Starts a background refresh unless the cached board is fresh or one is running."""
+        if self.state() == FRESH or (self.thread is not None and self.thread.is_alive()):
+            return False
+        self.thread = threading.Thread(target=self.refresh, name='global-leaderboard', daemon=True)
+        self.thread.start()
+        return True
+
+    def refresh(self):
+        """Revalidates the cached board now.  Returns True if a new board arrived."""
+        with self.lock:
+            try:
+                changed = self.fetch()
+                self.error = None
+                return changed
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                self.error = str(e) or type(e).__name__
+                self.close()
+                return False
+
+    def request(self, headers):
+        """GET on the keep-alive connection, reconnecting once if the server dropped it."""
+        for attempt in range(2):
+            if self.connection is None:
+                connection_class = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+                self.connection = connection_class(self.host, timeout=self.timeout)
+            try:
+                self.connection.request('GET', self.path, headers=headers)
+                response = self.connection.getresponse()
+                return response, response.read()  # Read it all so the connection can be reused
+            except (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                    ConnectionResetError, BrokenPipeError):
+                self.close()
+                if attempt:
+                    raise
+
+    def fetch(self):
+        cache = self.cache
+        headers = {'Accept': 'application/json'}
+        if cache is not None:
+            if cache.get('etag'):
+                headers['If-None-Match'] = cache['etag']
+            if cache.get('last_modified'):
+                headers['If-Modified-Since'] = cache['last_modified']
+        response, body = self.request(headers)
+        self.last_status = response.status
+        now = time.time()
+        if response.status == 304 and cache is not None:
+            self.cache = dict(cache, fetched_at=now)
+            self.save_cache(self.cache)
+            return False
+        if response.status != 200:
+            raise ValueError(f"{self.url} returned {response.status}")
+        data = json.loads(body)
+        entries = clean_entries(data.get('entries') if isinstance(data, dict) else data)
+        self.cache = {
+            'url': self.url,
+            'etag': response.getheader('ETag'),
+            'last_modified': response.getheader('Last-Modified'),
+            'fetched_at': now,
+            'entries': entries,
+        }
+        self.save_cache(self.cache)
+        self.version += 1
+        return True
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# Local stand-in for /api/leaderboard: serves a JSON file (a list of entries, or
+# {"entries": [...]}) the way the API answers GET, plus ETag and Last-Modified.
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    board_path = 'board.json'
+
+    def do_GET(self):
+        try:
+            with open(self.board_path, 'rb') as f:
+                board = json.load(f)
+            modified = os.path.getmtime(self.board_path)
+        except (OSError, json.JSONDecodeError) as e:
+            self.send_body(500, json.dumps({'error': str(e)}).encode())
+            return
+        entries = board.get('entries', []) if isinstance(board, dict) else board
+        body = json.dumps({'entries': entries, 'source': 'stand-in'}).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        last_modified = email.utils.formatdate(modified, usegmt=True)
+
+        not_modified = False
+        if self.headers.get('If-None-Match'):
+            not_modified = etag in [tag.strip() for tag in self.headers['If-None-Match'].split(',')]
+        elif self.headers.get('If-Modified-Since'):
+            try:
+                since = email.utils.parsedate_to_datetime(self.headers['If-Modified-Since']).timestamp()
+                not_modified = int(modified) <= since
+            except (TypeError, ValueError):
+                pass
+        headers = {'ETag': etag, 'Last-Modified': last_modified, 'Cache-Control': 'no-cache'}
+        self.send_body(304 if not_modified else 200, b'' if not_modified else body, headers)
+
+    def send_body(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(board_path, host='127.0.0.1', port=8766):
+    handler = type('Handler', (StandInHandler,), {'board_path': board_path})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Leaderboard stand-in serving {board_path} on http://{host}:{server.server_port}/api/leaderboard")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read the global leaderboard, or serve a local stand-in.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help="serve a JSON file like /api/leaderboard")
+    serve_parser.add_argument('board')
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8766)
+    fetch_parser = subparsers.add_parser('fetch', help="revalidate the cached board and print it")
+    fetch_parser.add_argument('url')
+    fetch_parser.add_argument('--cache', default=CACHE_FILE)
+    fetch_parser.add_argument('--repeat', type=int, default=1, help="requests to make on one connection")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.board, args.host, args.port)
+        return 0
+
+    board = GlobalLeaderboard(args.url, cache_path=args.cache)
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        board.refresh()
+        elapsed = (time.perf_counter() - started) * 1000
+        if board.error:
+            print(f"Failed: {board.error}")
+            return 1
+        print(f"HTTP {board.last_status} in {elapsed:.1f} ms, {len(board.cache['entries'])} entries")
+    board.close()
+    for rank, entry in enumerate(sorted(board.cache['entries'], key=lambda x: x['score'], reverse=True)[:10], 1):
+        print(f"{rank:>3}. {entry['name']:<20} {entry['score']:>8} (level {entry['level']})")
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
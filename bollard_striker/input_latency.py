@@ -0,0 +1,171 @@
+"""
+Input handling with event filtering, timestamps and input-to-flip latency.
+
+Each screen only lets the SDL event types it handles into the queue
+(pygame.event.set_allowed), so the queue never fills up with mouse motion or
+window events nobody reads.  The screens that take typed text also let
+TEXTINPUT and TEXTEDITING through, so IMEs and on-screen keyboards work
+(`python input_latency.py test` checks each screen).  Input events are timestamped when they arrive and
+the latency to the first display flip after they were handled goes into the
+FrameProfiler, which reports its percentiles next to the frame times.
+
+pygame events carry no timestamp, so instead of sleeping through the frame
+cap with Clock.tick() the game waits on the event queue
+(pygame.event.wait with a timeout) and stamps events as they arrive.  Events
+that were already queued when the game looked (read by poll() during a frame,
+or found waiting before a wait) arrived some time after the queue was last
+seen empty; they are stamped with that time, the earliest they can have
+arrived, so latency is never under-reported.
+
+In low-latency mode the game waits *before* reading input instead of after
+presenting: it sleeps until just before the frame deadline, leaving time for
+the work that follows input (judged from recent frames), then reads the
+keyboard, moves, draws and presents.  This pays off when the flip waits for
+vsync (the SDL2 renderer): in normal mode input read at the top of the frame
+then sits through the vsync wait, in low-latency mode it doesn't.  With a
+flip that returns at once both modes average about half a frame.
+"""
+import sys
+import time
+
+import pygame
+
+# Typed text arrives as TEXTINPUT (whatever produced it: keyboard layout, IME, on-screen
+# keyboard), with TEXTEDITING for an IME's unfinished composition.  KEYDOWN is for keys.
+TEXT_EVENTS = (pygame.TEXTINPUT, pygame.TEXTEDITING)
+
+# Event types each screen handles; everything else is dropped by SDL
+ALLOWED_EVENTS = {
+    'game': (pygame.QUIT, pygame.KEYDOWN, pygame.KEYUP),
+    'landing': (pygame.QUIT, pygame.MOUSEBUTTONDOWN),
+    'leaderboard': (pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.MOUSEWHEEL, pygame.KEYDOWN, *TEXT_EVENTS),
+    'name_entry': (pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN, *TEXT_EVENTS),
+}
+TEXT_SCREENS = [name for name, types in ALLOWED_EVENTS.items() if pygame.TEXTINPUT in types]
+
+# Events whose effect shows up on screen, and so count towards latency
+TIMED_EVENTS = (pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN)
+
+SAFETY_MARGIN = 0.001  # Extra time (s) left before the deadline in low-latency mode
+ESTIMATE_DECAY = 0.98  # How fast the post-input work estimate forgets a slow frame
+
+
+class InputTracker:
+    def __init__(self, profiler, low_latency=False):
+        self.profiler = profiler
+        self.low_latency = low_latency
+        self.screen = None
+        self.buffered = []         # Events taken off the queue while waiting, with their arrival times
+        self.pending = []          # Arrival times of handled events not yet on screen
+        self.deadline = None       # When the current frame should be presented
+        self.input_read = None     # When input was read in the current frame
+        self.post_input = 0.004    # Estimate (s) of input -> present work, for low-latency mode
+        self.frame_wait = 0.0      # Time (s) spent waiting in the current frame
+        self.drained = None        # When the queue was last seen empty
+
+    def allow(self, screen_name):
+        """Restricts the SDL queue to the events `screen_name` handles."""
+        if screen_name != self.screen and screen_name in ALLOWED_EVENTS:
+            pygame.event.set_blocked(None)
+            pygame.event.set_allowed(ALLOWED_EVENTS[screen_name])
+            self.screen = screen_name
+
+    def poll(self, screen_name):
+        """Everything that arrived since the last poll, oldest first."""
+        self.allow(screen_name)
+        events = pygame.event.get()
+        now = time.perf_counter()
+        arrived = now if self.drained is None else self.drained  # Queued since then
+        for event in events:
+            if event.type in TIMED_EVENTS:
+                self.pending.append(arrived)
+        self.drained = now
+        if self.buffered:
+            for arrived, event in self.buffered:
+                if event.type in TIMED_EVENTS:
+                    self.pending.append(arrived)
+            events = [event for _, event in self.buffered] + events
+            self.buffered = []
+        self.input_read = now
+        return events
+
+    def wait_until(self, deadline):
+        """Sleeps until `deadline` (perf_counter time), taking events off the queue as they arrive."""
+        started = time.perf_counter()
+        now = started
+        while now < deadline:
+            if pygame.event.peek():
+                # Queued while the frame was being worked on
+                event = pygame.event.poll()
+                arrived = now if self.drained is None else self.drained
+                now = time.perf_counter()
+            else:
+                # Nothing queued: wait() returns as soon as something arrives
+                self.drained = now
+                event = pygame.event.wait(max(1, int((deadline - now) * 1000)))
+                now = arrived = time.perf_counter()
+            if event.type != pygame.NOEVENT:
+                self.buffered.append((arrived, event))
+        self.frame_wait += now - started
+
+    def before_input(self, frame_rate):
+        """In low-latency mode, waits until the last moment input can be read and still make the deadline."""
+        self.frame_wait = 0.0
+        if not (self.low_latency and frame_rate):
+            return
+        if self.deadline is None:
+            self.deadline = time.perf_counter() + 1 / frame_rate
+        self.wait_until(self.deadline - self.post_input - SAFETY_MARGIN)
+
+    def presented(self):
+        """Call right after a display flip: everything handled so far is now on screen."""
+        now = time.perf_counter()
+        if self.pending:
+            for arrived in self.pending:
+                self.profiler.record_latency((now - arrived) * 1000)
+            self.pending = []
+        if self.low_latency and self.input_read is not None:
+            self.post_input = max(now - self.input_read, self.post_input * ESTIMATE_DECAY)
+
+    def end_frame(self, frame_rate):
+        """Frame cap: waits out the rest of the frame (normal mode) and schedules the next deadline."""
+        if not frame_rate:
+            self.deadline = None
+            return
+        period = 1 / frame_rate
+        now = time.perf_counter()
+        if self.deadline is None or now > self.deadline + period:
+            self.deadline = now + (0 if self.low_latency else period)  # First frame, or fell behind
+        if not self.low_latency:
+            self.wait_until(self.deadline)
+        self.deadline += period
+
+
+def test():
+    """Posts typed text on every screen: the screens that take text get it, the others don't."""
+    import os
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    pygame.display.set_mode((100, 100))
+    tracker = InputTracker(profiler=None)
+    failures = 0
+    for screen_name in ALLOWED_EVENTS:
+        tracker.poll(screen_name)
+        pygame.event.post(pygame.event.Event(pygame.TEXTINPUT, text='\u00e9'))
+        pygame.event.post(pygame.event.Event(pygame.TEXTEDITING, text='\u304b', start=0, length=1))
+        delivered = [event.type for event in tracker.poll(screen_name)]
+        for event_type in TEXT_EVENTS:
+            expected = screen_name in TEXT_SCREENS
+            ok = (event_type in delivered) == expected
+            failures += not ok
+            print(f"  {'ok' if ok else 'FAIL':<5}{screen_name:<12} {pygame.event.event_name(event_type):<12} "
+                  f"{'delivered' if event_type in delivered else 'dropped'}")
+    pygame.quit()
+    return failures
+
+
+if __name__ == '__main__':
+    if sys.argv[1:] == ['test']:
+        sys.exit(1 if test() else 0)
+    else:
+        print("usage: python input_latency.py test")
@@ -0,0 +1,314 @@
+"""
+Multi-kiosk leaderboard sync.
+
+Every game in score_history.db is identified by (node, seq): the kiosk that
+played it and that kiosk's own running game counter.  Kiosks exchange deltas,
+i.e. "games from node N after seq S", each signed with the leaderboard hash
+scheme.  Applying a delta is an INSERT OR IGNORE on (node, seq), so merges are
+idempotent and can happen in any order, and each kiosk only ever ships games
+the other side hasn't seen, so a sync costs as much as the new games, not the
+whole history.
+
+Each kiosk tracks, per node, the highest seq up to which it has every game
+(its version vector).  After a sync the local leaderboard.json is rebuilt from
+the merged history alone, with ties broken by date, node and seq, so kiosks
+that hold the same games show the same board whatever order the deltas came in.
+
+Two transports:
+
+    python kiosk_sync.py dir /mnt/kiosk-share        # shared directory
+    python kiosk_sync.py serve --port 8765           # hub on one machine
+    python kiosk_sync.py http http://hub:8765        # kiosks sync with the hub
+"""
+import argparse
+import http.client
+import json
+import os
+import re
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import score_history
+from leaderboard import LEADERBOARD_SIZE, generate_leaderboard_hash, save_leaderboard
+
+DELTA_NAME = re.compile(r'^(\d+)-(\d+)\.json$')
+FIELDS = ('node', 'seq', 'name', 'score', 'level', 'date')
+
+
+def connect(path=score_history.HISTORY_FILE):
+    connection = score_history.connect(path)
+    connection.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, seq INTEGER NOT NULL)")
+    return connection
+
+
+def get_state(connection, key):
+    row = connection.execute("SELECT seq FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+
+def set_state(connection, key, seq):
+    connection.execute("INSERT OR REPLACE INTO sync_state (key, seq) VALUES (?, ?)", (key, seq))
+
+
+def known_seq(connection, node):
+    """Highest seq up to which every game from `node` is present, advancing the stored mark."""
+    known = get_state(connection, 'known:' + node)
+    start = known
+    for (seq,) in connection.execute(
+            "SELECT seq FROM runs WHERE node = ? AND seq > ? ORDER BY seq", (node, known)):
+        if seq != known + 1:
+            break
+        known = seq
+    if known != start:
+        with connection:
+            set_state(connection, 'known:' + node, known)
+    return known
+
+
+def version_vector(connection):
+    # Distinct nodes by skipping through the (node, seq) index: one seek per node
+    # instead of reading the whole history
+    nodes = [node for (node,) in connection.execute(
+        """WITH RECURSIVE nodes(node) AS (
+               SELECT MIN(node) FROM runs
+               UNION ALL
+               SELECT (SELECT MIN(node) FROM runs WHERE node > nodes.node) FROM nodes WHERE node IS NOT NULL)
+           SELECT node FROM nodes WHERE node IS NOT NULL""")]
+    return {node: known_seq(connection, node) for node in nodes}
+
+
+def make_delta(connection, node, since):
+    """All games from `node` after `since`, signed with the leaderboard hash."""
+    rows = connection.execute(
+        "SELECT node, seq, name, score, level, date FROM runs WHERE node = ? AND seq > ? ORDER BY seq",
+        (node, since)).fetchall()
+    entries = [dict(zip(FIELDS, row)) for row in rows]
+    if not entries:
+        return None
+    return {
+        'node': node,
+        'first': entries[0]['seq'],
+        'last': entries[-1]['seq'],
+        'entries': entries,
+        'hash': generate_leaderboard_hash(entries),
+    }
+
+
+def apply_delta(connection, delta):
+    """Merges a delta and returns how many games were new.  Deltas that fail the hash check are dropped."""
+    entries = delta.get('entries', [])
+    if delta.get('hash') != generate_leaderboard_hash(entries):
+        print(f"Delta from {delta.get('node')} has been tampered with! Skipping it.")
+        return 0
+    before = connection.total_changes
+    with connection:
+        connection.executemany(
+            "INSERT OR IGNORE INTO runs (node, seq, name, score, level, date) VALUES (?, ?, ?, ?, ?, ?)",
+            [tuple(entry[field] for field in FIELDS) for entry in entries])
+    return connection.total_changes - before
+
+
+def rebuild_leaderboard(connection):
+    """Rewrites leaderboard.json as the top scores of the merged history.  The same games
+    always give the same board: ties go to the earlier game, then by node and seq."""
+    leaderboard = [{'name': name, 'score': score, 'level': level, 'date': date}
+                   for name, score, level, date in connection.execute(
+                       "SELECT name, score, level, date FROM runs ORDER BY score DESC, date, node, seq LIMIT ?",
+                       (LEADERBOARD_SIZE,))]
+    save_leaderboard(leaderboard)
+
+
+# Shared directory transport: each kiosk appends delta files to <shared>/<node>/
+def write_json_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def push_directory(connection, shared_dir):
+    node = score_history.local_node()
+    published = get_state(connection, 'published:' + node)
+    delta = make_delta(connection, node, published)
+    if delta is None:
+        return 0
+    node_dir = os.path.join(shared_dir, node)
+    os.makedirs(node_dir, exist_ok=True)
+    write_json_atomic(os.path.join(node_dir, f"{delta['first']:012d}-{delta['last']:012d}.json"), delta)
+    with connection:
+        set_state(connection, 'published:' + node, delta['last'])
+    return len(delta['entries'])
+
+
+def pull_directory(connection, shared_dir):
+    local = score_history.local_node()
+    merged = 0
+    for node in sorted(os.listdir(shared_dir)):
+        node_dir = os.path.join(shared_dir, node)
+        if node == local or not os.path.isdir(node_dir):
+            continue
+        known = known_seq(connection, node)
+        files = []
+        for filename in os.listdir(node_dir):
+            match = DELTA_NAME.match(filename)
+            if match and int(match.group(2)) > known:
+                files.append((int(match.group(1)), int(match.group(2)), filename))
+        for first, last, filename in sorted(files):
+            if first > known + 1:
+                break  # A delta is missing (or not copied yet); wait for it
+            try:
+                with open(os.path.join(node_dir, filename), 'r') as f:
+                    merged += apply_delta(connection, json.load(f))
+            except json.JSONDecodeError:
+                print(f"Delta file {node}/{filename} is corrupted. Skipping it.")
+                break
+            known = known_seq(connection, node)
+    return merged
+
+
+# HTTP transport: a hub keeps the merged history, kiosks exchange deltas with it
+def valid_delta(delta):
+    return (isinstance(delta, dict) and isinstance(delta.get('entries', []), list) and
+            all(isinstance(entry, dict) and all(field in entry for field in FIELDS)
+                for entry in delta.get('entries', [])))
+
+
+def valid_request(request):
+    """Whether a /sync body has the shape the hub can merge (delta hashes are checked later)."""
+    if not isinstance(request, dict):
+        return False
+    vector = request.get('vector', {})
+    deltas = request.get('deltas', [])
+    return (isinstance(vector, dict) and
+            all(isinstance(seq, int) and not isinstance(seq, bool) for seq in vector.values()) and
+            isinstance(deltas, list) and all(valid_delta(delta) for delta in deltas))
+
+
+class SyncHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so a sync is two requests on one connection
+    db_path = score_history.HISTORY_FILE
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urllib.parse.urlparse(self.path).path != '/vector':
+            self.send_json({'error': 'not found'}, 404)
+            return
+        connection = connect(self.db_path)
+        try:
+            self.send_json({'vector': version_vector(connection)})
+        finally:
+            connection.close()
+
+    def do_POST(self):
+        if urllib.parse.urlparse(self.path).path != '/sync':
+            self.send_json({'error': 'not found'}, 404)
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            if length < 0:
+                raise ValueError("negative Content-Length")
+            request = json.loads(self.rfile.read(length))
+        except ValueError:  # Includes json.JSONDecodeError
+            self.send_json({'error': 'invalid Content-Length or JSON'}, 400)
+            return
+        if not valid_request(request):
+            self.send_json({'error': 'expected {"vector": {node: seq}, "deltas": [delta, ...]}'}, 400)
+            return
+        connection = connect(self.db_path)
+        try:
+            merged = sum(apply_delta(connection, delta) for delta in request.get('deltas', []))
+            client_vector = request.get('vector', {})
+            deltas = []
+            for node, known in version_vector(connection).items():
+                if known > client_vector.get(node, 0):
+                    deltas.append(make_delta(connection, node, client_vector.get(node, 0)))
+            self.send_json({'merged': merged, 'deltas': [delta for delta in deltas if delta]})
+        finally:
+            connection.close()
+
+    def log_message(self, format, *args):
+        pass  # Keep kiosk logs quiet
+
+
+def serve(db_path, host='0.0.0.0', port=8765):
+    handler = type('Handler', (SyncHandler,), {'db_path': db_path})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Sync hub listening on {host}:{server.server_port}")
+    server.serve_forever()
+
+
+def sync_http(connection, url):
+    """Two requests on one keep-alive connection: fetch the hub's vector, then swap deltas."""
+    parsed = urllib.parse.urlparse(url)
+    connection_class = http.client.HTTPSConnection if parsed.scheme == 'https' else http.client.HTTPConnection
+    hub = connection_class(parsed.netloc, timeout=30)
+    try:
+        hub.request('GET', '/vector')
+        response = hub.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Sync hub returned {response.status} for its vector")
+        hub_vector = json.loads(body)['vector']
+
+        local_vector = version_vector(connection)
+        deltas = []
+        for node, known in local_vector.items():
+            if known > hub_vector.get(node, 0):
+                deltas.append(make_delta(connection, node, hub_vector.get(node, 0)))
+        body = json.dumps({'vector': local_vector, 'deltas': [delta for delta in deltas if delta]})
+        hub.request('POST', '/sync', body=body, headers={'Content-Type': 'application/json'})
+        response = hub.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Sync hub returned {response.status}: {body[:200].decode(errors='replace')}")
+        reply = json.loads(body)
+    finally:
+        hub.close()
+    pushed = sum(len(delta['entries']) for delta in deltas if delta)
+    merged = sum(apply_delta(connection, delta) for delta in reply.get('deltas', []))
+    return pushed, merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge leaderboards between Bollard Striker kiosks.")
+    parser.add_argument('--db', default=score_history.HISTORY_FILE)
+    parser.add_argument('--node', help="this kiosk's name (default: $BOLLARD_NODE or the hostname)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    dir_parser = subparsers.add_parser('dir', help="sync through a shared directory")
+    dir_parser.add_argument('shared_dir')
+    http_parser = subparsers.add_parser('http', help="sync with a hub")
+    http_parser.add_argument('url')
+    serve_parser = subparsers.add_parser('serve', help="run a sync hub")
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.node:
+        os.environ['BOLLARD_NODE'] = args.node
+    if args.command == 'serve':
+        serve(args.db, args.host, args.port)
+        return
+
+    connection = connect(args.db)
+    try:
+        if args.command == 'dir':
+            os.makedirs(args.shared_dir, exist_ok=True)
+            pushed = push_directory(connection, args.shared_dir)
+            merged = pull_directory(connection, args.shared_dir)
+        else:
+            pushed, merged = sync_http(connection, args.url)
+        rebuild_leaderboard(connection)
+    finally:
+        connection.close()
+    print(f"Pushed {pushed} games, merged {merged} new games")
+
+
+if __name__ == '__main__':
+    main()
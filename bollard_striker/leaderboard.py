@@ -0,0 +1,93 @@
+"""
+Local leaderboard storage: the hashed top-5 leaderboard.json file.
+
+Shared by the game and the kiosk sync tool, which both need the same hash scheme.
+"""
+import datetime
+import hashlib  # Import hashlib for hashing
+import json
+import os
+import sqlite3
+
+import score_history
+
+# Secret key for hashing (keep this secret!)
+SECRET_KEY = "your_very_secret_key"  # Define a secret key
+
+# Leaderboard file
+LEADERBOARD_FILE = 'leaderboard.json'
+
+# Entries kept on the board
+LEADERBOARD_SIZE = 5
+
+# Function to generate hash for the leaderboard data
+def generate_leaderboard_hash(data):
+    """
+    Generates a SHA-256 hash of the leaderboard data combined with a secret key.
+    """
+    hash_input = json.dumps(data, sort_keys=True) + SECRET_KEY
+    return hashlib.sha256(hash_input.encode()).hexdigest()
+
+# Function to save leaderboard entries with their hash
+def save_leaderboard(leaderboard):
+    # Generate hash for the leaderboard
+    leaderboard_hash = generate_leaderboard_hash(leaderboard)
+
+    # Save the leaderboard and its hash to the file
+    with open(LEADERBOARD_FILE, 'w') as f:
+        json.dump({
+            'entries': leaderboard,
+            'hash': leaderboard_hash
+        }, f, indent=4)
+
+# Function to update and save the leaderboard with hash
+def update_leaderboard(player_name, score, level):
+    leaderboard = []  # Initialize an empty leaderboard
+
+    # Check if the file exists and contains valid JSON
+    if os.path.exists(LEADERBOARD_FILE):
+        try:
+            with open(LEADERBOARD_FILE, 'r') as f:
+                leaderboard_data = json.load(f)
+                leaderboard = leaderboard_data.get('entries', [])
+        except json.JSONDecodeError:
+            print("Leaderboard file is empty or corrupted. Initializing new leaderboard.")
+
+    # Add the new score with additional details
+    entry = {
+        'name': player_name,
+        'score': score,
+        'level': level,
+        'date': datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+    leaderboard.append(entry)
+
+    # Keep every game in the score history, not just the top 5
+    try:
+        score_history.record_run(entry['name'], entry['score'], entry['level'], entry['date'])
+    except sqlite3.Error as e:
+        print(f"Error recording score history: {e}")
+
+    # Sort the leaderboard by score in descending order and keep the top 5 scores
+    leaderboard = sorted(leaderboard, key=lambda x: x['score'], reverse=True)[:LEADERBOARD_SIZE]
+    save_leaderboard(leaderboard)
+
+# Function to load and verify the leaderboard
+def load_leaderboard():
+    if os.path.exists(LEADERBOARD_FILE):
+        try:
+            with open(LEADERBOARD_FILE, 'r') as f:
+                leaderboard_data = json.load(f)
+                leaderboard = leaderboard_data.get('entries', [])
+                stored_hash = leaderboard_data.get('hash', '')
+
+                # Verify the hash
+                computed_hash = generate_leaderboard_hash(leaderboard)
+                if stored_hash != computed_hash:
+                    print("Leaderboard data has been tampered with!")
+                    return []  # Return empty leaderboard or handle as desired
+                return leaderboard
+        except json.JSONDecodeError:
+            print("Leaderboard file is empty or corrupted. Initializing new leaderboard.")
+            return []
+    return []
@@ -0,0 +1,252 @@
+"""
+Scrollable, paginated leaderboard over the full score history.
+
+The history can hold every game ever played, so the leaderboard screen never
+loads it whole.  It shows a window of ranks, fetched a page at a time by rank
+range (score_history.rank_range), and renders only the rows on screen.
+Rendered rows go into a small surface cache.
+
+All database work happens on a background thread with its own SQLite
+connection.  When the window gets close to the end of a page, the next page
+is requested ahead of time, so scrolling never waits on a query.  Rows that
+haven't arrived yet are drawn as placeholders.
+
+Search by name asks the database for the player's best rank and jumps there.
+Without a history (or when it can't be read) the view falls back to the
+leaderboard.json entries.
+"""
+import collections
+import os
+import queue
+import sqlite3
+import threading
+
+import pygame
+
+import score_history
+
+PAGE_SIZE = 50
+PAGE_CACHE_SIZE = 8
+ROW_CACHE_SIZE = 64
+PREFETCH_MARGIN = 10  # Rows from the end of a page at which the next page is requested
+
+# Column layout: (x offset, alignment) for rank, name, score, level, date
+COLUMN_X = ((90, 'right'), (110, 'left'), (450, 'right'), (530, 'right'), (560, 'left'))
+COLUMN_TITLES = ('#', 'Name', 'Score', 'Level', 'Date')
+NAME_WIDTH = 250  # Long names are clipped to this many pixels
+
+
+class HistoryRanking:
+    """Ranks from score_history.db.  Only used from the view's worker thread."""
+
+    def __init__(self, path=score_history.HISTORY_FILE):
+        self.path = path
+        self.connection = None
+
+    def open(self):
+        if not os.path.exists(self.path):
+            raise sqlite3.OperationalError(f"{self.path} not found")
+        self.connection = score_history.connect(self.path)
+
+    def count(self):
+        return score_history.count_runs(self.connection)
+
+    def rows(self, first_rank, count):
+        return score_history.rank_range(self.connection, first_rank, count)
+
+    def find(self, name):
+        return score_history.find_rank(self.connection, name)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+
+class ListRanking:
+    """Ranks from a list of leaderboard entries (the leaderboard.json fallback)."""
+
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=lambda x: x['score'], reverse=True)
+
+    def open(self):
+        pass
+
+    def count(self):
+        return len(self.entries)
+
+    def rows(self, first_rank, count):
+        return [(rank, entry['name'], entry['score'], entry['level'], entry['date'])
+                for rank, entry in enumerate(self.entries[first_rank - 1:first_rank - 1 + count], first_rank)]
+
+    def find(self, name):
+        for rank, entry in enumerate(self.entries, 1):
+            if entry['name'].lower() == name.lower():
+                return rank
+        return None
+
+    def close(self):
+        pass
+
+
+class LeaderboardView:
+    def __init__(self, ranking, fallback, font, rect, row_height, text_color, highlight_color, placeholder_color):
+        self.font = font
+        self.rect = pygame.Rect(rect)
+        self.row_height = row_height
+        self.visible_rows = (self.rect.height - row_height) // row_height  # First line is the column header
+        self.text_color = text_color
+        self.highlight_color = highlight_color
+        self.placeholder_color = placeholder_color
+
+        self.top = 1            # Rank of the first visible row
+        self.total = None       # Number of ranked games, once the worker has counted them
+        self.highlight = None   # Rank found by the last search
+        self.message = ''
+        self.pages = collections.OrderedDict()  # Page index -> rows, least recently used first
+        self.requested = set()
+        self.row_cache = collections.OrderedDict()
+        self.header = self.render_row(COLUMN_TITLES, self.placeholder_color)
+
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, args=(ranking, fallback),
+                                       name='leaderboard-pages', daemon=True)
+        self.thread.start()
+
+    # Worker thread: owns the ranking (and its SQLite connection)
+    def run(self, ranking, fallback):
+        try:
+            ranking.open()
+            total = ranking.count()
+        except sqlite3.Error:
+            total = 0
+        if not total:
+            ranking.close()
+            ranking = fallback()
+            ranking.open()
+            total = ranking.count()
+        self.results.put(('count', total))
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            kind, argument = request
+            try:
+                if kind == 'page':
+                    self.results.put(('page', argument, ranking.rows(argument * PAGE_SIZE + 1, PAGE_SIZE)))
+                elif kind == 'find':
+                    self.results.put(('found', argument, ranking.find(argument)))
+            except sqlite3.Error as e:
+                print(f"Error reading score history: {e}")
+        ranking.close()
+
+    def close(self):
+        self.requests.put(None)
+
+    # Game thread
+    def update(self):
+        """Takes in whatever the worker has finished and requests the pages the window needs."""
+        while True:
+            try:
+                result = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if result[0] == 'count':
+                self.total = result[1]
+                self.scroll(0)
+            elif result[0] == 'page':
+                _, index, rows = result
+                self.requested.discard(index)
+                self.pages[index] = rows
+                while len(self.pages) > PAGE_CACHE_SIZE:
+                    self.pages.popitem(last=False)
+            elif result[0] == 'found':
+                _, name, rank = result
+                if rank is None:
+                    self.message = f"No games found for {name}"
+                else:
+                    self.message = ''
+                    self.highlight = rank
+                    self.jump_to(rank - self.visible_rows // 2)
+
+        if self.total is None:
+            return
+        first_page = (self.top - 1) // PAGE_SIZE
+        last_page = (self.top - 1 + self.visible_rows - 1) // PAGE_SIZE
+        wanted = list(range(first_page, last_page + 1))
+        # Prefetch the page after (or before) the window when it gets close to a page boundary
+        if (self.top - 1 + self.visible_rows) % PAGE_SIZE > PAGE_SIZE - PREFETCH_MARGIN:
+            wanted.append(last_page + 1)
+        if (self.top - 1) % PAGE_SIZE < PREFETCH_MARGIN and first_page > 0:
+            wanted.append(first_page - 1)
+        for index in wanted:
+            if index * PAGE_SIZE < self.total and index not in self.pages and index not in self.requested:
+                self.requested.add(index)
+                self.requests.put(('page', index))
+
+    def scroll(self, rows):
+        self.jump_to(self.top + rows)
+
+    def jump_to(self, rank):
+        last_top = max(1, (self.total or 0) - self.visible_rows + 1)
+        self.top = min(max(1, rank), last_top)
+
+    def search(self, name):
+        if name.strip():
+            self.message = f"Searching for {name.strip()}..."
+            self.requests.put(('find', name.strip()))
+
+    def row(self, rank):
+        page = self.pages.get((rank - 1) // PAGE_SIZE)
+        if page is None:
+            return None
+        self.pages.move_to_end((rank - 1) // PAGE_SIZE)
+        offset = (rank - 1) % PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def render_row(self, values, color):
+        surface = pygame.Surface((self.rect.width, self.row_height), pygame.SRCALPHA)
+        for column, (value, (x, align)) in enumerate(zip(values, COLUMN_X)):
+            text = self.font.render(str(value), True, color)
+            if column == 1 and text.get_width() > NAME_WIDTH:
+                text = text.subsurface((0, 0, NAME_WIDTH, text.get_height()))
+            y = (self.row_height - text.get_height()) // 2
+            surface.blit(text, (x - text.get_width() if align == 'right' else x, y))
+        return surface
+
+    def cached_row(self, row, color):
+        key = (row, color)
+        surface = self.row_cache.get(key)
+        if surface is None:
+            surface = self.render_row(row, color)
+            self.row_cache[key] = surface
+            if len(self.row_cache) > ROW_CACHE_SIZE:
+                self.row_cache.popitem(last=False)
+        else:
+            self.row_cache.move_to_end(key)
+        return surface
+
+    def draw(self, surface):
+        surface.blit(self.header, self.rect.topleft)
+        if self.total is None:
+            return
+        y = self.rect.y + self.row_height
+        for rank in range(self.top, min(self.top + self.visible_rows, self.total + 1)):
+            row = self.row(rank)
+            if row is None:
+                row_surface = self.cached_row((rank, '...', '', '', ''), self.placeholder_color)
+            else:
+                row_surface = self.cached_row(row, self.highlight_color if rank == self.highlight else self.text_color)
+            surface.blit(row_surface, (self.rect.x, y))
+            y += self.row_height
+
+    def status(self):
+        """One line for under the list: the visible ranks, or the last search result."""
+        if self.message:
+            return self.message
+        if self.total is None:
+            return "Loading..."
+        if not self.total:
+            return "No games yet"
+        last = min(self.top + self.visible_rows - 1, self.total)
+        return f"Ranks {self.top}-{last} of {self.total}"
@@ -0,0 +1,83 @@
+"""
+Rolling frame-time statistics.
+
+main_game() records how long each frame took (the full frame interval,
+including the frame-cap wait) and how much of it was actual work, and the
+input handler records the latency from each input event to the flip that
+showed it.  The last `window` samples are kept in preallocated arrays so
+recording is cheap, and summary()/report() give mean, percentiles and worst
+case over that window.
+"""
+import array
+
+
+class FrameProfiler:
+    def __init__(self, window=600):
+        self.window = window
+        self.frame_ms = array.array('d', bytes(8 * window))
+        self.work_ms = array.array('d', bytes(8 * window))
+        self.input_ms = array.array('d', bytes(8 * window))
+        self.count = 0  # Frames recorded in total
+        self.input_count = 0  # Input latencies recorded in total
+        self.interval_total = 0.0  # Frame time since the last take_interval()
+        self.interval_max = 0.0
+        self.interval_frames = 0
+
+    def record(self, frame_ms, work_ms):
+        slot = self.count % self.window
+        self.frame_ms[slot] = frame_ms
+        self.work_ms[slot] = work_ms
+        self.count += 1
+        self.interval_total += frame_ms
+        self.interval_frames += 1
+        if frame_ms > self.interval_max:
+            self.interval_max = frame_ms
+
+    def record_latency(self, input_ms):
+        self.input_ms[self.input_count % self.window] = input_ms
+        self.input_count += 1
+
+    def take_interval(self):
+        """Mean and worst frame time (ms) since the last call, then starts a new interval."""
+        frames = self.interval_frames
+        result = (self.interval_total / frames if frames else 0.0, self.interval_max)
+        self.interval_total = 0.0
+        self.interval_max = 0.0
+        self.interval_frames = 0
+        return result
+
+    def recent(self, values, count=None):
+        """The recorded part of a window, in no particular order."""
+        return values[:min(self.count if count is None else count, self.window)]
+
+    @staticmethod
+    def stats(values):
+        if not values:
+            return {'frames': 0}
+        ordered = sorted(values)
+        count = len(ordered)
+        return {
+            'frames': count,
+            'mean_ms': sum(ordered) / count,
+            'p50_ms': ordered[count // 2],
+            'p95_ms': ordered[min(count - 1, int(count * 0.95))],
+            'p99_ms': ordered[min(count - 1, int(count * 0.99))],
+            'max_ms': ordered[-1],
+        }
+
+    def summary(self):
+        return {
+            'frame': self.stats(self.recent(self.frame_ms)),
+            'work': self.stats(self.recent(self.work_ms)),
+            'input': self.stats(self.recent(self.input_ms, self.input_count)),
+        }
+
+    def report(self):
+        lines = [f"Profiler: {self.count} frames, {self.input_count} input events (last {self.window} of each shown; "
+                 f"input = event to flip)"]
+        for name, stats in self.summary().items():
+            if stats['frames']:
+                lines.append(f"  {name:<6} mean {stats['mean_ms']:.2f} ms, p50 {stats['p50_ms']:.2f} ms, "
+                             f"p95 {stats['p95_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms, "
+                             f"max {stats['max_ms']:.2f} ms")
+        return '\n'.join(lines)
@@ -0,0 +1,158 @@
+"""
+Adaptive quality: steps rendering down when frames miss their budget.
+
+The game feeds the governor the work time of every frame (waits for the frame
+cap or for vsync left out), on the game screen and in the menus.  Every
+WINDOW frames it looks at the mean: over the 60 fps budget means one tier
+down, well under it for several windows in a row means one tier back up.
+Tiers are cumulative:
+
+    0  full quality
+    1  no text shadows on menu buttons
+    2  dirty-rect presents (only the rects that changed go to the display)
+    3  gameplay drawn at LOW_SCALE and stretched (surface renderer)
+    4  frame cap lowered to LOW_FRAME_RATE
+
+Dirty rects only help when the gameplay frame is the display: a stretched
+frame (render scale other than 1, a fullscreen software blit, every tier from
+3 on) or the texture renderer shows the whole frame anyway.  Where tier 2
+can't apply the game passes it in `skip` and the governor steps straight
+between tiers 1 and 3.
+
+Hysteresis: stepping up needs UP_WINDOWS good windows in a row, and a tier
+that had to be left again soon after stepping up to it needs twice as many
+next time.  A budget that's only just missed doesn't flip-flop between two
+tiers.
+
+On startup calibrate() draws a few frames at each tier and starts at the
+first one that fits the budget, so a slow kiosk doesn't spend its first
+seconds stuttering.  Like record(), it leaves out the time present() spends
+waiting for vsync.
+"""
+import time
+
+TIER_FULL = 0
+TIER_NO_SHADOWS = 1
+TIER_DIRTY_RECTS = 2
+TIER_LOW_SCALE = 3
+TIER_LOW_FRAME_RATE = 4
+TIER_NAMES = ('full', 'no text shadows', 'dirty rects', 'low render scale', 'low frame rate')
+
+FRAME_BUDGET_MS = 1000 / 60
+WINDOW = 30               # Frames per decision
+UP_RATIO = 0.6            # Mean work below this share of the budget counts towards a step up
+UP_WINDOWS = 4            # Good windows in a row before stepping up
+MAX_UP_WINDOWS = 64       # Cap on the backoff after a relapse
+RELAPSE_WINDOWS = 8       # Stepping down this soon after a step up counts as a relapse
+LOW_SCALE = 0.5
+LOW_FRAME_RATE = 30
+CALIBRATION_FRAMES = 8    # Frames timed per tier at startup (after two warm-up frames)
+
+
+class QualityGovernor:
+    def __init__(self, tier=TIER_FULL, adaptive=True, budget_ms=FRAME_BUDGET_MS, on_change=None, skip=()):
+        self.skip = frozenset(skip) - {TIER_FULL}  # Tiers that change nothing here, stepped over
+        self.tier = tier
+        self.adaptive = adaptive
+        self.budget_ms = budget_ms
+        self.on_change = on_change  # Called with the governor after every tier change
+        self.window_total = 0.0
+        self.window_frames = 0
+        self.good_windows = 0
+        self.windows = 0            # Decisions made so far
+        self.last_step_up = None    # Decision count at the last step up
+        self.up_windows = [UP_WINDOWS] * len(TIER_NAMES)  # Good windows needed to step up to each tier
+        self.changes = 0
+
+    # What the current tier turns off
+    @property
+    def text_shadows(self):
+        return self.tier < TIER_NO_SHADOWS
+
+    @property
+    def dirty_rects(self):
+        return self.tier >= TIER_DIRTY_RECTS
+
+    def render_scale(self, scale):
+        return min(scale, LOW_SCALE) if self.tier >= TIER_LOW_SCALE else scale
+
+    def frame_rate(self, frame_rate):
+        """The frame cap to use (0 stays uncapped)."""
+        if self.tier >= TIER_LOW_FRAME_RATE and frame_rate:
+            return min(frame_rate, LOW_FRAME_RATE)
+        return frame_rate
+
+    def tier_budget(self, tier):
+        """Work time a frame may take at `tier` (the lowest tier's frames have more time)."""
+        if tier >= TIER_LOW_FRAME_RATE:
+            return max(self.budget_ms, 1000 / LOW_FRAME_RATE)
+        return self.budget_ms
+
+    def set_tier(self, tier):
+        tier = min(max(TIER_FULL, tier), len(TIER_NAMES) - 1)
+        step = 1 if tier > self.tier else -1
+        while tier in self.skip:
+            tier += step
+        if tier != self.tier:
+            self.tier = tier
+            self.changes += 1
+            self.window_total = 0.0
+            self.window_frames = 0
+            self.good_windows = 0
+            if self.on_change:
+                self.on_change(self)
+
+    def record(self, work_ms):
+        """Call once per frame.  True if the tier changed."""
+        if not self.adaptive:
+            return False
+        self.window_total += work_ms
+        self.window_frames += 1
+        if self.window_frames < WINDOW:
+            return False
+        mean = self.window_total / self.window_frames
+        self.window_total = 0.0
+        self.window_frames = 0
+        self.windows += 1
+        if mean > self.tier_budget(self.tier) and self.tier < len(TIER_NAMES) - 1:
+            if self.last_step_up is not None and self.windows - self.last_step_up <= RELAPSE_WINDOWS:
+                self.up_windows[self.tier] = min(self.up_windows[self.tier] * 2, MAX_UP_WINDOWS)
+            self.set_tier(self.tier + 1)
+            return True
+        if mean < self.budget_ms * UP_RATIO and self.tier > TIER_FULL:
+            self.good_windows += 1
+            if self.good_windows >= self.up_windows[self.tier - 1]:
+                self.last_step_up = self.windows
+                self.set_tier(self.tier - 1)
+                return True
+        else:
+            self.good_windows = 0
+        return False
+
+    def report(self):
+        return f"Quality: tier {self.tier} ({TIER_NAMES[self.tier]}), {self.changes} changes"
+
+
+def calibrate(governor, draw_frame, frames=CALIBRATION_FRAMES):
+    """Startup micro-benchmark: times draw_frame() at each tier from the top and
+    settles on the first one whose median frame fits the budget.  draw_frame()
+    returns how long (s) it waited for vsync, which isn't counted.  Returns the
+    median frame time (ms) at each tier tried."""
+    medians = []
+    for tier in range(len(TIER_NAMES)):
+        if tier in governor.skip:
+            continue
+        governor.set_tier(tier)
+        for _ in range(2):
+            draw_frame()  # Warm up caches (and the window after a reopen)
+        times = []
+        for _ in range(frames):
+            started = time.perf_counter()
+            vsync_wait = draw_frame()
+            times.append((time.perf_counter() - started - vsync_wait) * 1000)
+        times.sort()
+        medians.append(times[len(times) // 2])
+        if medians[-1] <= governor.tier_budget(tier):
+            break
+    governor.changes = 0
+    return medians
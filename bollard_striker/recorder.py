@@ -0,0 +1,233 @@
+"""
+Gameplay recording to raw (optionally zlib-compressed) video frames.
+
+After each flip the game calls capture(surface) with the display surface.
+The pixels are copied straight out of the surface buffer (get_buffer(), one
+memcpy, no per-pixel Python objects) into a free slot of a preallocated ring
+of frame buffers and the slot is queued for a background writer thread.
+When the writer falls behind and no slot is free the frame is dropped and
+counted rather than making the game wait.  `decimate` records every Nth
+frame.
+
+capture() is timed; when its average cost goes over `budget_ms` per frame the
+recorder doubles its decimation instead of eating into the frame budget,
+down to one frame a second at most (MAX_DECIMATE frames for an uncapped game).
+Every frame carries the decimation it was captured at, so a recording whose
+rate dropped part-way still says which stretches were sparser.
+
+File layout:
+
+    header   magic, version, flags, width, height, pitch, bytes per pixel,
+             RGBA masks, frame rate, decimation at the start
+    frame    frame number, perf_counter time, decimation, stored length, then
+             the pixel rows exactly as they were in the surface (pitch bytes each)
+
+    python recorder.py info game.bsrec
+    python recorder.py export game.bsrec frames/     # one PNG per frame
+"""
+import argparse
+import array
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import pygame
+
+MAGIC = b'BSREC\x00\x00\x01'
+VERSION = 2
+FLAG_ZLIB = 1
+HEADER = struct.Struct('<8sHHIIIB4IHH')  # magic, version, flags, w, h, pitch, bytesize, masks, fps, decimate
+FRAME = struct.Struct('<IdHI')           # frame number, time, decimation, stored length
+FRAME_V1 = struct.Struct('<IdI')         # Version 1 had no per-frame decimation
+MAX_DECIMATE = 60                        # Sparsest automatic rate without a frame rate: about one frame a second
+
+
+class Recorder:
+    def __init__(self, path, decimate=1, slots=8, compress=False, budget_ms=1.0, frame_rate=60):
+        self.path = path
+        self.decimate = min(max(1, decimate), 0xFFFF)  # Stored as 16 bits
+        self.slot_count = slots
+        self.compress = compress
+        self.budget_ms = budget_ms
+        self.frame_rate = frame_rate
+        self.frames_seen = 0
+        self.frames_written = 0
+        self.dropped = 0
+        self.capture_ms = array.array('d')  # Cost of every capture() that copied a frame
+        self.buffer = None                  # Allocated on the first frame, once the size is known
+        self.file = None
+        self.free_slots = queue.Queue()
+        self.full_slots = queue.Queue()
+        self.thread = None
+
+    def start(self, surface):
+        width, height = surface.get_size()
+        self.frame_bytes = surface.get_pitch() * height
+        self.size = (width, height)
+        self.buffer = bytearray(self.frame_bytes * self.slot_count)
+        self.slots = [memoryview(self.buffer)[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+                      for index in range(self.slot_count)]
+        for index in range(self.slot_count):
+            self.free_slots.put(index)
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.file = open(self.path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, FLAG_ZLIB if self.compress else 0, width, height,
+                                    surface.get_pitch(), surface.get_bytesize(), *surface.get_masks(),
+                                    self.frame_rate, self.decimate))
+        self.thread = threading.Thread(target=self.run, name='recorder-writer', daemon=True)
+        self.thread.start()
+
+    def capture(self, surface):
+        """Call right after the flip.  Copies the frame into a free slot, or drops it."""
+        frame_number = self.frames_seen
+        self.frames_seen += 1
+        if frame_number % self.decimate:
+            return
+        started = time.perf_counter()
+        if self.buffer is None:
+            self.start(surface)
+        elif surface.get_pitch() * surface.get_height() != self.frame_bytes:
+            return  # The display was reopened at another size; keep the recording consistent
+        try:
+            index = self.free_slots.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        pixels = surface.get_buffer()  # Locks the surface until released
+        self.slots[index][:] = pixels
+        del pixels
+        self.full_slots.put((index, frame_number, started, self.decimate))
+        cost = (time.perf_counter() - started) * 1000
+        self.capture_ms.append(cost)
+        self.check_budget()
+
+    def check_budget(self, window=60):
+        count = len(self.capture_ms)
+        if count % window == 0:
+            mean = sum(self.capture_ms[count - window:]) / window
+            # At least a frame a second is kept, however slow capture is (and the count has to fit FRAME)
+            limit = self.frame_rate or MAX_DECIMATE
+            if mean > self.budget_ms and self.decimate < limit:
+                self.decimate = min(self.decimate * 2, limit)
+                print(f"Recorder: capture takes {mean:.2f} ms per frame (budget {self.budget_ms} ms), "
+                      f"now recording every {self.decimate} frames")
+
+    def run(self):
+        while True:
+            item = self.full_slots.get()
+            if item is None:
+                return
+            index, frame_number, captured, decimate = item
+            data = self.slots[index]
+            if self.compress:
+                data = zlib.compress(data, 1)  # Releases the GIL while it works
+            self.file.write(FRAME.pack(frame_number, captured, decimate, len(data)))
+            self.file.write(data)
+            self.free_slots.put(index)
+            self.frames_written += 1
+
+    def close(self):
+        """Writes out the queued frames and closes the file."""
+        if self.thread is not None:
+            self.full_slots.put(None)
+            self.thread.join()
+            self.thread = None
+            self.file.close()
+
+    def report(self):
+        ordered = sorted(self.capture_ms)
+        lines = [f"Recorder: {self.frames_written} frames written to {self.path}, {self.dropped} dropped, "
+                 f"recording every {self.decimate} frames"]
+        if ordered:
+            lines.append(f"  capture mean {sum(ordered) / len(ordered):.3f} ms, "
+                         f"p95 {ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]:.3f} ms, "
+                         f"max {ordered[-1]:.3f} ms (budget {self.budget_ms} ms)")
+        return '\n'.join(lines)
+
+
+def read_recording(path):
+    """Yields (header dict, frame number, time, decimation, raw pixel bytes) for every frame in a recording."""
+    with open(path, 'rb') as f:
+        fields = HEADER.unpack(f.read(HEADER.size))
+        if fields[0] != MAGIC:
+            raise ValueError(f"{path} is not a Bollard Striker recording")
+        header = dict(zip(('magic', 'version', 'flags', 'width', 'height', 'pitch', 'bytesize'), fields[:7]))
+        header['masks'] = fields[7:11]
+        header['fps'], header['decimate'] = fields[11:13]
+        frame = FRAME if header['version'] >= 2 else FRAME_V1
+        while True:
+            raw = f.read(frame.size)
+            if len(raw) < frame.size:
+                return
+            if frame is FRAME:
+                frame_number, captured, decimate, length = frame.unpack(raw)
+            else:
+                (frame_number, captured, length), decimate = frame.unpack(raw), header['decimate']
+            data = f.read(length)
+            if len(data) < length:
+                return  # Truncated by a crash mid-write
+            if header['flags'] & FLAG_ZLIB:
+                data = zlib.decompress(data)
+            yield header, frame_number, captured, decimate, data
+
+
+def frame_to_surface(header, data):
+    """Rebuilds a Surface from a recorded frame."""
+    width, height, pitch = header['width'], header['height'], header['pitch']
+    surface = pygame.Surface((width, height), 0, header['bytesize'] * 8, header['masks'])
+    if surface.get_pitch() == pitch:
+        surface.get_buffer().write(data)
+    else:
+        buffer = surface.get_buffer()
+        row_bytes = width * header['bytesize']
+        for row in range(height):
+            buffer.write(data[row * pitch:row * pitch + row_bytes], row * surface.get_pitch())
+        del buffer
+    return surface
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and export Bollard Striker gameplay recordings.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    info_parser = subparsers.add_parser('info', help="frame count, size and timing")
+    info_parser.add_argument('recording')
+    export_parser = subparsers.add_parser('export', help="write every frame as a PNG")
+    export_parser.add_argument('recording')
+    export_parser.add_argument('out_dir')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        header, count, first, last = None, 0, None, None
+        decimations = []  # (decimation, from frame) every time it changed
+        for header, frame_number, captured, decimate, data in read_recording(args.recording):
+            count += 1
+            first = captured if first is None else first
+            last = captured
+            if not decimations or decimations[-1][0] != decimate:
+                decimations.append((decimate, frame_number))
+        if header is None:
+            print("No frames recorded.")
+            return 1
+        duration = last - first
+        every = ', then '.join(f"every {decimate} frames" + (f" from frame {start}" if index else '')
+                               for index, (decimate, start) in enumerate(decimations))
+        print(f"{count} frames, {header['width']}x{header['height']}, {every}, "
+              f"{duration:.1f}s ({count / duration if duration else 0:.1f} frames/s), "
+              f"{'zlib' if header['flags'] & FLAG_ZLIB else 'raw'}")
+    else:
+        os.makedirs(args.out_dir, exist_ok=True)
+        count = 0
+        for header, frame_number, captured, decimate, data in read_recording(args.recording):
+            pygame.image.save(frame_to_surface(header, data), os.path.join(args.out_dir, f"{frame_number:06d}.png"))
+            count += 1
+        print(f"Wrote {count} frames to {args.out_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
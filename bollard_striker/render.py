@@ -0,0 +1,161 @@
+"""
+Render pipeline: fixed internal resolution, one scaled present.
+
+Gameplay is drawn into `frame`, an offscreen surface at the logical 800x600
+size times the internal render scale; menus are drawn into `ui` at the logical
+size, so the render scale never blurs menu text.  present() puts either onto
+the display with at most one scaled blit.  With pygame.SCALED the display
+itself stays at the logical size and SDL stretches it to the panel on the
+GPU; with PRESENT_BLIT the display is the panel and the one blit does the
+whole stretch.  Either way gameplay fill and blit cost depend on the internal
+resolution, not on the panel the kiosk is plugged into.
+
+When the scale is 1 and the window is the logical size, frame, ui and the
+display are the same surface and present() is a plain display.flip(), or a
+display.update() of just the given dirty rects.
+
+Gameplay code draws through load_sprite()/draw_sprite()/draw_text()/fill_rect()/
+draw_particles() in logical coordinates, so the texture backend in sdl2_backend.py can be
+swapped in without touching the game loop.
+"""
+import pygame
+
+# How present() stretches the internal frame to the display
+PRESENT_BLIT = 'blit'      # One pygame.transform.scale into the display surface
+PRESENT_SCALED = 'scaled'  # Window opened at the logical size with pygame.SCALED, stretched to the panel by SDL
+
+# Rendered text kept around between frames (HUD strings repeat a lot)
+TEXT_CACHE_SIZE = 256
+
+
+class RenderPipeline:
+    def __init__(self, logical_size, scale=1.0, fullscreen=False, present_mode=PRESENT_SCALED,
+                 caption=None):
+        self.logical_size = logical_size
+        self.fullscreen = fullscreen
+        self.present_mode = present_mode
+        self.caption = caption
+        self.display = None
+        self.mode = None  # (size, flags) the display was opened with
+        self.present_waits = False  # present() doesn't wait for vsync
+        self.sources = {}  # name -> (original image, logical size)
+        self.sprites = {}  # name -> image pre-scaled for the internal resolution
+        self.text_cache = {}
+        self.set_scale(scale)
+
+    def set_scale(self, scale):
+        """(Re)opens the display for a new internal scale and re-scales loaded sprites."""
+        self.scale = scale
+        self.internal_size = (max(1, int(self.logical_size[0] * scale)),
+                              max(1, int(self.logical_size[1] * scale)))
+
+        # The display doesn't depend on the scale (menus stay at the logical size), so
+        # it's only opened when the mode changes, not on every scale change
+        if self.present_mode == PRESENT_SCALED and self.fullscreen:
+            mode = (self.logical_size, pygame.SCALED | pygame.FULLSCREEN)
+        elif self.fullscreen:
+            mode = ((0, 0), pygame.FULLSCREEN)
+        else:
+            mode = (self.logical_size, 0)
+        if mode != self.mode:
+            self.display = pygame.display.set_mode(*mode)
+            self.mode = mode
+            if self.caption:
+                pygame.display.set_caption(self.caption)
+
+        # Pixel format convert_alpha() gives on this display
+        self.alpha_masks = pygame.Surface((1, 1), pygame.SRCALPHA).convert_alpha().get_masks()
+        display_size = self.display.get_size()
+        self.frame = self.display if display_size == self.internal_size else pygame.Surface(self.internal_size)
+        self.ui = self.display if display_size == self.logical_size else pygame.Surface(self.logical_size)
+
+        for name, (image, logical_size) in self.sources.items():
+            self.sprites[name] = self.scale_sprite(image, logical_size)
+        self.text_cache.clear()
+
+    @property
+    def partial_present(self):
+        """True when present() can update just the dirty rects: the frame is the display."""
+        return self.frame is self.display
+
+    def px(self, value):
+        """Converts a logical length or coordinate to internal pixels."""
+        return int(value * self.scale)
+
+    def to_logical(self, pos):
+        """Maps a display position (e.g. event.pos) back to logical coordinates."""
+        display_w, display_h = self.display.get_size()
+        return (pos[0] * self.logical_size[0] // display_w, pos[1] * self.logical_size[1] // display_h)
+
+    def mouse_pos(self):
+        return self.to_logical(pygame.mouse.get_pos())
+
+    def event_pos(self, event):
+        """Logical position of a mouse event."""
+        return self.to_logical(event.pos)
+
+    def scale_sprite(self, image, logical_size):
+        """Pre-scales a sprite to its size at the internal resolution and converts it for fast blits."""
+        size = (max(1, self.px(logical_size[0])), max(1, self.px(logical_size[1])))
+        if image.get_size() == size and image.get_masks() == self.alpha_masks:
+            return image  # Already right (e.g. shared by asset_host.py): no copy
+        return pygame.transform.smoothscale(image.convert_alpha(), size)
+
+    def load_sprite(self, name, image, logical_size):
+        self.sources[name] = (image, logical_size)
+        self.sprites[name] = self.scale_sprite(image, logical_size)
+
+    def font_size(self, logical_size):
+        """Point size for fonts used with draw_text()."""
+        return max(1, self.px(logical_size))
+
+    # Gameplay drawing, all in logical coordinates
+    def clear(self, color):
+        self.frame.fill(color)
+
+    def draw_sprite(self, name, x, y):
+        self.frame.blit(self.sprites[name], (self.px(x), self.px(y)))
+
+    def draw_sprites(self, name, positions):
+        image = self.sprites[name]
+        scale = self.scale
+        self.frame.blits([(image, (int(x * scale), int(y * scale))) for x, y in positions], False)
+
+    def render_text(self, font, text, color):
+        """Renders text once and reuses it until it falls out of the cache."""
+        key = (id(font), text, color)
+        image = self.text_cache.get(key)
+        if image is None:
+            if len(self.text_cache) >= TEXT_CACHE_SIZE:
+                self.text_cache.clear()
+            image = self.text_cache[key] = font.render(text, True, color)
+        return image
+
+    def draw_text(self, font, text, color, x, y):
+        self.frame.blit(self.render_text(font, text, color), (self.px(x), self.px(y)))
+
+    def fill_rect(self, color, rect):
+        x, y, w, h = rect
+        self.frame.fill(color, (self.px(x), self.px(y), max(1, self.px(w)), max(1, self.px(h))))
+
+    def draw_particles(self, particles):
+        """Draws a particles.ParticleSystem straight into the frame's pixels."""
+        particles.draw(self.frame, self.scale)
+
+    def present(self, surface=None, dirty=None):
+        """Shows `surface` (a menu drawn at the logical size) or, by default, the gameplay frame.
+
+        `dirty` lists the logical rects that changed since the last present; when the
+        surface is the display only those are updated (a stretched frame is shown whole).
+        """
+        if surface is None:
+            surface = self.frame
+        if surface is not self.display:
+            pygame.transform.scale(surface, self.display.get_size(), self.display)
+            pygame.display.flip()
+        elif dirty is not None:
+            scale = self.scale if surface is self.frame else 1
+            pygame.display.update([(int(x * scale), int(y * scale), int(w * scale) + 1, int(h * scale) + 1)
+                                   for x, y, w, h in dirty])
+        else:
+            pygame.display.flip()
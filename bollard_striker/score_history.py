@@ -0,0 +1,355 @@
+"""
+Full score history and a compact columnar export of it.
+
+update_leaderboard() only keeps the top 5, so every finished game is also
+recorded here (an SQLite file next to the leaderboard).  For analytics the
+history is exported in chunks to a columnar file (and the leaderboard screen
+pages through it by rank with rank_range()/find_rank()):
+
+    header   magic, version, flags, column count, then one descriptor per
+             column (name, array typecode)
+    chunk    b'CHNK', row count, then (stored length, raw length) per column,
+             followed by each column's bytes padded to 8 bytes
+
+Numeric columns are stored as plain arrays (optionally zlib-compressed per
+column), strings as an offsets array followed by UTF-8 data.  Readers mmap the
+file and only touch the columns they ask for; uncompressed numeric columns are
+read straight out of the mapping without a copy.
+
+    python score_history.py export history.bsc --compress
+    python score_history.py stats history.bsc
+    python score_history.py to-csv history.bsc history.csv
+"""
+import argparse
+import array
+import csv
+import datetime
+import mmap
+import os
+import socket
+import sqlite3
+import struct
+import sys
+import zlib
+
+HISTORY_FILE = 'score_history.db'
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+MAGIC = b'BSCOLS\x00\x01'
+VERSION = 1
+FLAG_ZLIB = 1
+HEADER = struct.Struct('<8sHHH')      # magic, version, flags, column count
+COLUMN = struct.Struct('<16sc')       # name, typecode ('s' for strings)
+CHUNK = struct.Struct('<4sI')         # b'CHNK', row count
+COLUMN_LENGTHS = struct.Struct('<II')  # stored length, raw length
+ALIGN = 8
+
+# Exported columns: (name, typecode, SQL expression)
+COLUMNS = (
+    ('id', 'q', 'id'),
+    ('name', 's', 'name'),
+    ('score', 'q', 'score'),
+    ('level', 'i', 'level'),
+    ('date', 'q', 'date'),  # Seconds since the epoch, local time like the leaderboard
+    ('node', 's', 'node'),
+    ('seq', 'q', 'seq'),
+)
+
+
+# Function to open (and create if needed) the history database
+def connect(path=HISTORY_FILE):
+    connection = sqlite3.connect(path, timeout=10)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            score INTEGER NOT NULL,
+            level INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            node TEXT,
+            seq INTEGER
+        )""")
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(runs)")]
+    if 'node' not in columns:
+        # Histories recorded before kiosk sync: claim the existing games for this kiosk
+        with connection:
+            connection.execute("ALTER TABLE runs ADD COLUMN node TEXT")
+            connection.execute("ALTER TABLE runs ADD COLUMN seq INTEGER")
+            connection.execute("UPDATE runs SET node = ?, seq = id", (local_node(),))
+    connection.execute("CREATE INDEX IF NOT EXISTS runs_score ON runs (score DESC)")
+    connection.execute("CREATE INDEX IF NOT EXISTS runs_name ON runs (name COLLATE NOCASE, score DESC)")
+    # Every game is identified by the kiosk that played it and that kiosk's sequence number
+    connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS runs_node_seq ON runs (node, seq)")
+    return connection
+
+
+# Function to get the name this kiosk records its games under
+def local_node():
+    return os.environ.get('BOLLARD_NODE') or socket.gethostname()
+
+
+# Function to record one finished game
+def record_run(name, score, level, date, path=HISTORY_FILE):
+    connection = connect(path)
+    node = local_node()
+    try:
+        # Sessions on one machine can share a node and a database: the next seq is read inside
+        # the INSERT, in a transaction that takes the write lock up front, so two of them can't
+        # both read the same MAX(seq)
+        connection.isolation_level = 'IMMEDIATE'
+        with connection:
+            connection.execute(
+                """INSERT INTO runs (name, score, level, date, node, seq)
+                   SELECT ?, ?, ?, ?, ?, COALESCE(MAX(seq), 0) + 1 FROM runs WHERE node = ?""",
+                (name, int(score), int(level), date, node, node))
+    finally:
+        connection.close()
+
+
+# Ranking: games ordered by score, earlier games first on ties.  The runs_score
+# index holds (score, id), so both the ordering and rank counts are index-only.
+def count_runs(connection):
+    return connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+
+def rank_range(connection, first_rank, count):
+    """(rank, name, score, level, date) for ranks first_rank .. first_rank + count - 1."""
+    rows = connection.execute(
+        """SELECT runs.name, runs.score, runs.level, runs.date
+           FROM (SELECT id FROM runs ORDER BY score DESC, id LIMIT ? OFFSET ?) AS page
+           JOIN runs ON runs.id = page.id
+           ORDER BY runs.score DESC, runs.id""",
+        (count, max(0, first_rank - 1))).fetchall()
+    return [(rank,) + row for rank, row in enumerate(rows, max(1, first_rank))]
+
+
+def find_rank(connection, name):
+    """Rank of the best game played under `name` (any case), or None."""
+    best = connection.execute(
+        "SELECT score, id FROM runs WHERE name = ? COLLATE NOCASE ORDER BY score DESC, id LIMIT 1",
+        (name,)).fetchone()
+    if best is None:
+        return None
+    score, run_id = best
+    (higher,) = connection.execute("SELECT COUNT(*) FROM runs WHERE score > ?", (score,)).fetchone()
+    (tied,) = connection.execute("SELECT COUNT(*) FROM runs WHERE score = ? AND id < ?", (score, run_id)).fetchone()
+    return higher + tied + 1
+
+
+def date_to_epoch(date):
+    try:
+        return int(datetime.datetime.strptime(date, DATE_FORMAT).timestamp())
+    except ValueError:
+        return 0  # Hand-edited entries like "Eternal Lore"
+
+
+def epoch_to_date(seconds):
+    return datetime.datetime.fromtimestamp(seconds).strftime(DATE_FORMAT)
+
+
+def padding(length):
+    return -length % ALIGN
+
+
+def encode_column(typecode, values):
+    if typecode == 's':
+        offsets = array.array('I', [0])
+        blob = bytearray()
+        for value in values:
+            blob += value.encode('utf-8')
+            offsets.append(len(blob))
+        data = offsets.tobytes()
+        return data + bytes(padding(len(data))) + bytes(blob)
+    return array.array(typecode, values).tobytes()
+
+
+def write_chunk(f, rows, compress):
+    f.write(CHUNK.pack(b'CHNK', len(rows)))
+    payloads = []
+    for index, (name, typecode, _) in enumerate(COLUMNS):
+        values = [row[index] for row in rows]
+        if name == 'date':
+            values = [date_to_epoch(value) for value in values]
+        raw = encode_column(typecode, values)
+        stored = zlib.compress(raw, 6) if compress else raw
+        payloads.append((stored, len(raw)))
+    for stored, raw_length in payloads:
+        f.write(COLUMN_LENGTHS.pack(len(stored), raw_length))
+    f.write(bytes(padding(f.tell())))
+    for stored, _ in payloads:
+        f.write(stored)
+        f.write(bytes(padding(len(stored))))
+
+
+# Function to stream the history into a columnar file, chunk_rows games at a time
+def export(out_path, db_path=HISTORY_FILE, chunk_rows=65536, compress=False):
+    connection = connect(db_path)
+    total = 0
+    try:
+        cursor = connection.execute(
+            "SELECT " + ", ".join(sql for _, _, sql in COLUMNS) + " FROM runs ORDER BY id")
+        with open(out_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, FLAG_ZLIB if compress else 0, len(COLUMNS)))
+            for name, typecode, _ in COLUMNS:
+                f.write(COLUMN.pack(name.encode('ascii'), typecode.encode('ascii')))
+            f.write(bytes(padding(f.tell())))
+            while True:
+                rows = cursor.fetchmany(chunk_rows)
+                if not rows:
+                    break
+                write_chunk(f, rows, compress)
+                total += len(rows)
+    finally:
+        connection.close()
+    return total
+
+
+class ColumnarReader:
+    """Memory-maps an exported file and yields only the requested columns, chunk by chunk."""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, count = HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a score history export")
+        self.compressed = bool(flags & FLAG_ZLIB)
+        self.columns = []
+        offset = HEADER.size
+        for _ in range(count):
+            name, typecode = COLUMN.unpack_from(self.map, offset)
+            self.columns.append((name.rstrip(b'\x00').decode('ascii'), typecode.decode('ascii')))
+            offset += COLUMN.size
+        self.data_start = offset + padding(offset)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def chunks(self, names=None):
+        """Yields (row count, {name: values}) with only the named columns decoded."""
+        wanted = set(names or [name for name, _ in self.columns])
+        offset = self.data_start
+        view = memoryview(self.map)
+        try:
+            while offset < len(self.map):
+                magic, rows = CHUNK.unpack_from(self.map, offset)
+                if magic != b'CHNK':
+                    raise ValueError(f"corrupt chunk at byte {offset}")
+                offset += CHUNK.size
+                lengths = [COLUMN_LENGTHS.unpack_from(self.map, offset + i * COLUMN_LENGTHS.size)
+                           for i in range(len(self.columns))]
+                offset += len(self.columns) * COLUMN_LENGTHS.size
+                offset += padding(offset)
+                values = {}
+                for (name, typecode), (stored, raw_length) in zip(self.columns, lengths):
+                    if name in wanted:
+                        values[name] = self._decode(view[offset:offset + stored], typecode, rows)
+                    offset += stored + padding(stored)
+                yield rows, values
+        finally:
+            view.release()
+
+    def _decode(self, data, typecode, rows):
+        if self.compressed:
+            data = memoryview(zlib.decompress(data))
+        if typecode != 's':
+            return data.cast(typecode)  # Zero-copy view when uncompressed
+        offsets_length = (rows + 1) * 4
+        offsets = data[:offsets_length].cast('I')
+        blob_start = offsets_length + padding(offsets_length)
+        blob = bytes(data[blob_start:])
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(rows)]
+
+
+def to_csv(in_path, out_file, names=None):
+    with ColumnarReader(in_path) as reader:
+        names = names or [name for name, _ in reader.columns]
+        writer = csv.writer(out_file)
+        writer.writerow(names)
+        for rows, values in reader.chunks(names):
+            columns = [values[name] for name in names]
+            if 'date' in values:
+                columns[names.index('date')] = [epoch_to_date(seconds) if seconds else ''
+                                                 for seconds in values['date']]
+            writer.writerows(zip(*columns))
+            # Drop the chunk's views before the next one so the mapping isn't pinned
+            del columns
+            values.clear()
+
+
+def stats(in_path):
+    """Scans only the score, level and date columns."""
+    games = 0
+    total_score = 0
+    best = None
+    first = last = None
+    per_level = {}
+    with ColumnarReader(in_path) as reader:
+        for rows, values in reader.chunks(('score', 'level', 'date')):
+            games += rows
+            total_score += sum(values['score'])
+            if rows:
+                chunk_best = max(values['score'])
+                best = chunk_best if best is None else max(best, chunk_best)
+                dates = [seconds for seconds in values['date'] if seconds]
+                if dates:
+                    first = min(dates) if first is None else min(first, min(dates))
+                    last = max(dates) if last is None else max(last, max(dates))
+            for level in values['level']:
+                per_level[level] = per_level.get(level, 0) + 1
+            values.clear()
+    return {
+        'games': games,
+        'mean_score': total_score / games if games else 0,
+        'best_score': best,
+        'first_game': epoch_to_date(first) if first else None,
+        'last_game': epoch_to_date(last) if last else None,
+        'games_per_level': dict(sorted(per_level.items())),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and inspect the Bollard Striker score history.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="write the history to a columnar file")
+    export_parser.add_argument('output')
+    export_parser.add_argument('--db', default=HISTORY_FILE)
+    export_parser.add_argument('--chunk-rows', type=int, default=65536)
+    export_parser.add_argument('--compress', action='store_true', help="zlib-compress each column")
+
+    csv_parser = subparsers.add_parser('to-csv', help="stream a columnar file to CSV")
+    csv_parser.add_argument('input')
+    csv_parser.add_argument('output', nargs='?', help="defaults to stdout")
+    csv_parser.add_argument('--columns', help="comma-separated subset, e.g. score,level,date")
+
+    stats_parser = subparsers.add_parser('stats', help="summarize scores from a columnar file")
+    stats_parser.add_argument('input')
+
+    args = parser.parse_args()
+    if args.command == 'export':
+        if not os.path.exists(args.db):
+            parser.error(f"{args.db} not found")
+        count = export(args.output, args.db, args.chunk_rows, args.compress)
+        print(f"Exported {count} games to {args.output}")
+    elif args.command == 'to-csv':
+        names = args.columns.split(',') if args.columns else None
+        if args.output:
+            with open(args.output, 'w', newline='') as f:
+                to_csv(args.input, f, names)
+        else:
+            to_csv(args.input, sys.stdout, names)
+    elif args.command == 'stats':
+        for key, value in stats(args.input).items():
+            print(f"{key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
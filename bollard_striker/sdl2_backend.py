@@ -0,0 +1,136 @@
+"""
+Texture renderer backend built on pygame._sdl2.video.
+
+Implements the same drawing interface as render.RenderPipeline, but sprites
+and rendered text are uploaded once as textures and each gameplay frame is a
+batch of texture copies that SDL scales to the window.  Menus are still drawn
+with Surface calls onto `ui` and uploaded into a single streaming texture when
+presented.
+
+Asks SDL for a GPU renderer first and falls back to its software renderer, so
+the same code path runs on machines without a GPU (and under the dummy video
+driver in CI).
+"""
+import pygame
+from pygame._sdl2.video import Renderer, Texture, Window, error as SDLError
+
+# Rendered text textures kept around between frames
+TEXT_CACHE_SIZE = 256
+
+
+class TextureRenderer:
+    def __init__(self, logical_size, fullscreen=False, caption=None, accelerated=True, vsync=True):
+        self.logical_size = logical_size
+        self.fullscreen = fullscreen
+        self.scale = 1  # SDL scales to the window, so everything is drawn at the logical size
+        self.window = Window(caption or "pygame", size=logical_size, fullscreen_desktop=fullscreen)
+        self.renderer = None
+        self.accelerated = False
+        self.present_waits = False
+        self.partial_present = False  # Every present() draws the whole frame
+        if accelerated:
+            try:
+                self.renderer = Renderer(self.window, accelerated=1, vsync=vsync)
+                self.accelerated = True
+                self.present_waits = vsync  # present() blocks until vsync
+            except (pygame.error, SDLError) as e:
+                print(f"No GPU renderer available, using software rendering: {e}")
+        if self.renderer is None:
+            self.renderer = Renderer(self.window, accelerated=0)
+        self.renderer.logical_size = logical_size
+        self.ui = pygame.Surface(logical_size)
+        self.ui_texture = Texture(self.renderer, logical_size, streaming=True)
+        # Particle effects layer (see draw_particles())
+        self.effects = pygame.Surface(logical_size, pygame.SRCALPHA)
+        self.effects_texture = Texture(self.renderer, logical_size, streaming=True)
+        self.effects_texture.blend_mode = pygame.BLENDMODE_BLEND
+        self.textures = {}
+        self.text_cache = {}
+
+    def set_scale(self, scale):
+        """The GPU (or SDL's software scaler) handles scaling; nothing to rebuild."""
+
+    def px(self, value):
+        return int(value)
+
+    def font_size(self, logical_size):
+        return logical_size
+
+    def to_logical(self, pos):
+        """Maps a window position back to logical coordinates.  The renderer keeps the aspect
+        ratio, so the picture is scaled uniformly and centred between letterbox bars."""
+        window_w, window_h = self.window.size
+        logical_w, logical_h = self.logical_size
+        scale = min(window_w / logical_w, window_h / logical_h)
+        offset_x = (window_w - logical_w * scale) / 2
+        offset_y = (window_h - logical_h * scale) / 2
+        return (int((pos[0] - offset_x) // scale), int((pos[1] - offset_y) // scale))
+
+    def mouse_pos(self):
+        return self.to_logical(pygame.mouse.get_pos())
+
+    def event_pos(self, event):
+        # The renderer's event watch has already mapped mouse events through the letterbox
+        return event.pos
+
+    def load_sprite(self, name, image, logical_size):
+        # No convert_alpha(): there is no display surface, and the texture upload converts anyway
+        image = pygame.transform.smoothscale(image, logical_size)
+        self.textures[name] = Texture.from_surface(self.renderer, image)
+
+    # Gameplay drawing, all in logical coordinates
+    def clear(self, color):
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.clear()
+
+    def draw_sprite(self, name, x, y):
+        texture = self.textures[name]
+        texture.draw(dstrect=(x, y, texture.width, texture.height))
+
+    def draw_sprites(self, name, positions):
+        texture = self.textures[name]
+        width, height = texture.width, texture.height
+        draw = texture.draw
+        for x, y in positions:
+            draw(dstrect=(x, y, width, height))
+
+    def render_text(self, font, text, color):
+        key = (id(font), text, color)
+        texture = self.text_cache.get(key)
+        if texture is None:
+            if len(self.text_cache) >= TEXT_CACHE_SIZE:
+                self.text_cache.clear()
+            texture = self.text_cache[key] = Texture.from_surface(self.renderer, font.render(text, True, color))
+        return texture
+
+    def draw_text(self, font, text, color, x, y):
+        texture = self.render_text(font, text, color)
+        texture.draw(dstrect=(x, y, texture.width, texture.height))
+
+    def fill_rect(self, color, rect):
+        self.renderer.draw_color = pygame.Color(color)
+        self.renderer.fill_rect(rect)
+
+    def draw_particles(self, particles):
+        """Draws a particles.ParticleSystem: the particles are written into a transparent
+        surface, and only the rect around them is uploaded and drawn as one texture."""
+        bounds = particles.bounds()
+        if bounds is None:
+            return
+        rect = pygame.Rect(bounds).clip(self.effects.get_rect())
+        if not rect.w or not rect.h:
+            return
+        area = self.effects.subsurface(rect)
+        area.fill((0, 0, 0, 0))
+        particles.draw(area, offset=(-rect.x, -rect.y))
+        self.effects_texture.update(area, rect)
+        self.effects_texture.draw(srcrect=rect, dstrect=rect)
+
+    def present(self, surface=None, dirty=None):
+        """Presents the batched gameplay frame, or uploads and shows a menu surface.
+        The whole frame is redrawn every time, so `dirty` is ignored."""
+        if surface is not None:
+            self.ui_texture.update(surface)
+            self.renderer.clear()
+            self.ui_texture.draw()
+        self.renderer.present()
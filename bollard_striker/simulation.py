@@ -0,0 +1,140 @@
+"""
+Headless version of the Bollard Striker game rules.
+
+Mirrors the update step in main_game() (bollard movement, respawn, scoring,
+collisions and increase_difficulty()) without a display, so tools can run
+thousands of games per second.  Collisions use the game's sprite-mask table
+(collision.py), so a hit here is a hit in the game.  Keep this in sync with
+bollard_striker.py.
+"""
+import random
+
+import game_state
+from collision import default_collider
+from waves import WaveEngine
+
+# Playfield and sprite sizes (same as bollard_striker.py)
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+VISITOR_SIZE = 100
+BOLLARD_WIDTH = 50
+BOLLARD_HEIGHT = 50
+BOLLARD_COUNT = 5
+VISITOR_SPEED = 7
+STARTING_HEALTH = 3
+FRAME_RATE = 60
+
+# Bumped whenever the rules change, so cached tuning results aren't reused
+RULES_VERSION = 4
+
+# Default progression rules, used when no tuned difficulty file exists
+DEFAULT_DIFFICULTY = {
+    'bollard_speed': 7,        # Starting bollard speed (pixels per frame)
+    'speed_step': 1,           # Speed added on every level up
+    'level_threshold': 10,     # Points required per level
+    'multiplier_step': 0.5,    # Score multiplier added on every level up
+}
+
+# Movement directions accepted by SimGame.step()
+LEFT = -1
+STAY = 0
+RIGHT = 1
+
+
+class SimGame:
+    """One headless game using the same progression rules as main_game()."""
+
+    def __init__(self, difficulty=None, seed=None, collider=None):
+        self.difficulty = dict(DEFAULT_DIFFICULTY)
+        if difficulty:
+            self.difficulty.update(difficulty)
+        self.collider = default_collider() if collider is None else collider
+        self.waves = WaveEngine(random.randrange(2 ** 32) if seed is None else seed)
+        self.reset()
+
+    def reset(self):
+        self.visitor_x = SCREEN_WIDTH // 2 - 50
+        self.visitor_y = SCREEN_HEIGHT - 150
+        self.visitor_health = STARTING_HEALTH
+        self.score = 0
+        self.current_level = 1
+        self.score_multiplier = 1
+        self.bollard_speed = self.difficulty['bollard_speed']
+        self.frame = 0
+        self.level_frames = [0]  # Frames spent in each level, index 0 is level 1
+        self.bollard_list = [[0, 0] for _ in range(BOLLARD_COUNT)]
+        self.waves.reset()
+        self.waves.respawn_all(self.bollard_list)
+
+    def snapshot(self, buffer=None, offset=0):
+        """The game state as bytes (or packed into `buffer`), for branching searches."""
+        return game_state.encode((self.visitor_x, self.visitor_y, self.visitor_health, self.score,
+                                  self.score_multiplier, self.current_level, self.bollard_speed),
+                                 self.waves, self.bollard_list, buffer, offset)
+
+    def restore(self, data, offset=0):
+        """Goes back to a snapshot.  The frame counters are statistics and aren't rewound."""
+        (self.visitor_x, self.visitor_y, self.visitor_health, self.score, self.score_multiplier,
+         self.current_level, self.bollard_speed) = game_state.decode(data, self.waves, self.bollard_list, offset)
+
+    @property
+    def game_over(self):
+        return self.visitor_health <= 0
+
+    @property
+    def final_score(self):
+        return int(self.score * self.score_multiplier)
+
+    def increase_difficulty(self):
+        if self.score >= self.difficulty['level_threshold'] * self.current_level:
+            self.bollard_speed += self.difficulty['speed_step']
+            self.current_level += 1
+            self.score_multiplier += self.difficulty['multiplier_step']
+            self.level_frames.append(0)
+            self.waves.set_level(self.current_level)
+
+    def collides(self):
+        return self.collider.hits(self.bollard_list, self.visitor_x, self.visitor_y)
+
+    def step(self, move=STAY):
+        """Advance one frame.  Returns True if the visitor was hit."""
+        if move == LEFT and self.visitor_x > 0:
+            self.visitor_x -= VISITOR_SPEED
+        elif move == RIGHT and self.visitor_x < SCREEN_WIDTH - VISITOR_SIZE:
+            self.visitor_x += VISITOR_SPEED
+
+        self.waves.advance(self.bollard_speed)
+        for bollard in self.bollard_list:
+            bollard[1] += self.bollard_speed
+            if bollard[1] > SCREEN_HEIGHT:
+                bollard[0], bollard[1] = self.waves.spawn()
+                self.score += 1 * self.score_multiplier
+                self.increase_difficulty()
+
+        self.frame += 1
+        self.level_frames[-1] += 1
+
+        if self.collides():
+            self.visitor_health -= 1
+            self.waves.respawn_all(self.bollard_list)
+            return True
+        return False
+
+
+def play(player, difficulty=None, seed=None, max_frames=FRAME_RATE * 60 * 30):
+    """
+    Plays one game with the given player callable and returns its statistics.
+
+    The player is called as player(game) each frame and returns LEFT, STAY or RIGHT.
+    Games are cut off after max_frames (30 minutes of play by default).
+    """
+    game = SimGame(difficulty, seed)
+    while not game.game_over and game.frame < max_frames:
+        game.step(player(game))
+    return {
+        'frames': game.frame,
+        'final_score': game.final_score,
+        'level': game.current_level,
+        'level_frames': game.level_frames,
+        'timed_out': not game.game_over,
+    }
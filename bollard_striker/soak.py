@@ -0,0 +1,224 @@
+"""
+Accelerated soak test for kiosk deployments.
+
+Runs the real game screens in a loop (landing page -> game -> name entry ->
+game over -> leaderboard -> back) under SDL's dummy video and audio drivers,
+with synthetic input, no frame cap and no game over delay, so days of kiosk
+use fit into minutes.  Leaderboard and score history files go to a scratch
+directory.
+
+Every few cycles it samples traced Python memory (tracemalloc), RSS, live
+pygame Surfaces, open file descriptors and the size of the leaderboard files.
+After a warm-up it compares the last sample with the first and fails (exit
+status 1) when any growth exceeds its budget.
+
+    python soak.py --minutes 10
+    python soak.py --cycles 500 --player autopilot
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class RandomPilot:
+    """Wanders left and right at random; games end quickly, which is what a soak wants."""
+
+    def __init__(self, seed):
+        self.rng = random.Random(seed)
+        self.move = 0
+        self.hold = 0
+
+    def decide(self, visitor_x, visitor_y, bollard_list, bollard_speed):
+        if self.hold <= 0:
+            self.move = self.rng.choice((-1, 0, 1))
+            self.hold = self.rng.randint(5, 30)
+        self.hold -= 1
+        return self.move
+
+
+class SyntheticInput:
+    """Stands in for bollard_striker.poll_events(): clicks through menus and types names."""
+
+    def __init__(self, game, seed):
+        self.game = game
+        self.rng = random.Random(seed)
+        self.typed = False
+        pygame = game.pygame
+        width, height = game.SCREEN_WIDTH, game.SCREEN_HEIGHT
+        # Button centres, from the layouts in show_landing_page() and show_leaderboard()
+        self.start_pos = (width // 2, height // 2 - 60)
+        self.back_pos = (width // 2, height - 75)
+        self.click = lambda pos: pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)
+
+    def __call__(self, screen_name):
+        pygame = self.game.pygame
+        events = pygame.event.get()  # Keep the real queue drained
+        if screen_name == 'landing':
+            events.append(self.click(self.start_pos))
+        elif screen_name == 'leaderboard':
+            events.append(self.click(self.back_pos))
+        elif screen_name == 'name_entry':
+            if not self.typed:
+                name = 'SOAK%d' % self.rng.randint(0, 9999)
+                for char in name:
+                    # A key press and the text it types, like SDL sends them
+                    events.append(pygame.event.Event(pygame.KEYDOWN, key=ord(char.lower()), unicode=char))
+                    events.append(pygame.event.Event(pygame.TEXTINPUT, text=char))
+                self.typed = True
+            else:
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, unicode='\r'))
+                self.typed = False
+        return events
+
+
+def count_live_surfaces(pygame):
+    """Surfaces aren't GC-tracked, so count the ones referenced from tracked objects."""
+    seen = set()
+    for obj in gc.get_objects():
+        for referent in gc.get_referents(obj):
+            if isinstance(referent, pygame.Surface):
+                seen.add(id(referent))
+    return len(seen)
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # Peak, not current, off Linux
+
+
+def open_file_count():
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return 0
+
+
+def file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def sample(game, leaderboard, score_history, cycle, started):
+    gc.collect()
+    traced, _ = tracemalloc.get_traced_memory()
+    return {
+        'cycle': cycle,
+        'elapsed': time.perf_counter() - started,
+        'traced': traced,
+        'rss': rss_bytes(),
+        'surfaces': count_live_surfaces(game.pygame),
+        'files': open_file_count(),
+        'leaderboard': file_size(leaderboard.LEADERBOARD_FILE),
+        'history': file_size(score_history.HISTORY_FILE),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the game screens in a fast loop and watch for leaks.")
+    parser.add_argument('--cycles', type=int, default=200, help="landing -> game -> leaderboard cycles")
+    parser.add_argument('--minutes', type=float, help="run for this long instead of a fixed cycle count")
+    parser.add_argument('--player', choices=('random', 'autopilot'), default='random')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--warmup', type=int, default=10, help="cycles before the baseline sample")
+    parser.add_argument('--sample-every', type=int, default=10)
+    parser.add_argument('--max-traced-growth-mb', type=float, default=5.0)
+    parser.add_argument('--max-rss-growth-mb', type=float, default=30.0)
+    parser.add_argument('--max-surface-growth', type=int, default=20)
+    parser.add_argument('--max-file-growth', type=int, default=2)
+    parser.add_argument('--max-leaderboard-bytes', type=int, default=4096)
+    parser.add_argument('--max-history-bytes-per-game', type=int, default=512)
+    args = parser.parse_args()
+
+    tracemalloc.start(10)
+    random.seed(args.seed)
+
+    # The game loads its assets relative to the working directory, then writes its files to a scratch one
+    sys.path.insert(0, GAME_DIR)
+    os.chdir(GAME_DIR)
+    import bollard_striker as game
+    from autopilot import Autopilot
+    import leaderboard
+    import score_history
+    import simulation
+    workdir = tempfile.mkdtemp(prefix='bollard-soak-')
+    os.chdir(workdir)
+
+    game.FRAME_RATE = 0
+    game.GAME_OVER_DELAY_MS = 0
+    game.poll_events = SyntheticInput(game, args.seed)
+    game.autopilot = Autopilot(time_budget=0.001, collider=game.collider) if args.player == 'autopilot' else RandomPilot(args.seed)
+
+    print(f"Soaking in {workdir} ({args.player} player)")
+    started = time.perf_counter()
+    deadline = started + args.minutes * 60 if args.minutes else None
+    baseline = None
+    samples = []
+    cycle = 0
+    frames_before = 0
+    while True:
+        if deadline is not None:
+            if time.perf_counter() >= deadline:
+                break
+        elif cycle >= args.cycles:
+            break
+        game.show_landing_page()
+        game.main_game()
+        cycle += 1
+
+        if cycle == args.warmup or (cycle > args.warmup and cycle % args.sample_every == 0):
+            current = sample(game, leaderboard, score_history, cycle, started)
+            samples.append(current)
+            if baseline is None:
+                baseline = current
+                frames_before = game.profiler.count
+            print(f"cycle {cycle:>6}  {current['elapsed']:8.1f}s  traced {current['traced'] / 1e6:7.2f} MB  "
+                  f"rss {current['rss'] / 1e6:7.1f} MB  surfaces {current['surfaces']:>5}  "
+                  f"files {current['files']:>3}  leaderboard {current['leaderboard']:>6} B")
+
+    if baseline is None or len(samples) < 2:
+        print("Not enough cycles after warm-up to judge growth.")
+        return 0
+
+    last = samples[-1]
+    games = last['cycle'] - baseline['cycle']
+    frames = game.profiler.count - frames_before
+    print(f"\n{games} games, {frames} frames in {last['elapsed'] - baseline['elapsed']:.1f}s after warm-up "
+          f"(~{frames / simulation.FRAME_RATE / 60:.1f} minutes of play at {simulation.FRAME_RATE} fps)")
+    checks = [
+        ('traced Python memory', (last['traced'] - baseline['traced']) / 1e6, args.max_traced_growth_mb, 'MB'),
+        ('RSS', (last['rss'] - baseline['rss']) / 1e6, args.max_rss_growth_mb, 'MB'),
+        ('live Surfaces', last['surfaces'] - baseline['surfaces'], args.max_surface_growth, 'surfaces'),
+        ('open files', last['files'] - baseline['files'], args.max_file_growth, 'files'),
+        ('leaderboard size', last['leaderboard'], args.max_leaderboard_bytes, 'B'),
+        ('history per game', (last['history'] - baseline['history']) / max(1, games),
+         args.max_history_bytes_per_game, 'B'),
+    ]
+    failed = False
+    for name, value, budget, unit in checks:
+        ok = value <= budget
+        failed = failed or not ok
+        print(f"  {'ok  ' if ok else 'FAIL'} {name}: {value:.2f} {unit} (budget {budget} {unit})")
+
+    if failed:
+        print("\nTop allocation growth since start:")
+        for stat in tracemalloc.take_snapshot().statistics('lineno')[:10]:
+            print(f"  {stat}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
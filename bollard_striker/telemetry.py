@@ -0,0 +1,187 @@
+"""
+Session telemetry: a preallocated ring buffer drained by a background thread.
+
+The game thread only calls emit(kind, a, b), which writes four list slots and
+bumps a counter; no allocation, locking or I/O.  A daemon thread wakes up a
+few times a second, takes everything written since its last visit as one
+batch, and appends it as JSON lines to a gzip file in the telemetry
+directory.  Files are rotated once they reach max_file_bytes (compressed) and
+only the newest max_files are kept.
+
+If the writer falls a whole buffer behind, new events are dropped and counted
+instead of blocking the game.
+
+    python telemetry.py bench    # measures the per-event cost of emit()
+"""
+import atexit
+import gzip
+import json
+import os
+import threading
+import time
+
+# Event kinds.  The meaning of the two numeric fields is listed next to each.
+GAME_START = 1    # a: starting health, b: starting bollard speed
+GAME_END = 2      # a: final score, b: level reached
+COLLISION = 3     # a: health left, b: score so far
+LEVEL_UP = 4      # a: new level, b: new bollard speed
+FRAME_STATS = 5   # a: mean frame time (us), b: worst frame time (us) since the last report
+MENU = 6          # a: screen (see MENU_* below), b: button (see BUTTON_* below)
+QUALITY = 7       # a: new quality tier (see quality.py), b: frame cap in effect
+
+EVENT_NAMES = {
+    GAME_START: 'game_start',
+    GAME_END: 'game_end',
+    COLLISION: 'collision',
+    LEVEL_UP: 'level_up',
+    FRAME_STATS: 'frame_stats',
+    MENU: 'menu',
+    QUALITY: 'quality',
+}
+
+# Screens and buttons for MENU events
+MENU_LANDING = 1
+MENU_LEADERBOARD = 2
+MENU_NAME_ENTRY = 3
+MENU_GAME_OVER = 4
+BUTTON_NONE = 0
+BUTTON_START = 1
+BUTTON_LEADERBOARD = 2
+BUTTON_SOUND = 3
+BUTTON_BACK = 4
+BUTTON_GITHUB = 5
+
+
+class Telemetry:
+    def __init__(self, directory='telemetry', capacity=1 << 16, flush_interval=0.5,
+                 max_file_bytes=4 << 20, max_files=20):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        self.directory = directory
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.flush_interval = flush_interval
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+
+        # Preallocated ring buffer, one list per field
+        self.kinds = [0] * capacity
+        self.times = [0.0] * capacity
+        self.a_values = [0] * capacity
+        self.b_values = [0] * capacity
+        self.head = 0      # Events written (game thread only)
+        self.tail = 0      # Events flushed (writer thread only)
+        self.dropped = 0   # Events lost to a full buffer, ever (game thread only)
+        self.reported = 0  # Drops already written out (writer thread only)
+        self.clock = time.perf_counter
+
+        # perf_counter() has no fixed epoch; remember where it was at a known wall-clock time
+        self.session = time.strftime("%Y%m%d-%H%M%S")
+        self.wall_offset = time.time() - time.perf_counter()
+        self.file = None
+        self.raw_file = None
+        self.file_index = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, name='telemetry-writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def emit(self, kind, a=0, b=0):
+        head = self.head
+        if head - self.tail >= self.capacity:
+            self.dropped += 1
+            return
+        slot = head & self.mask
+        self.kinds[slot] = kind
+        self.times[slot] = self.clock()
+        self.a_values[slot] = a
+        self.b_values[slot] = b
+        self.head = head + 1  # Publish last, so the writer never sees a half-written slot
+
+    def run(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        head = self.head
+        tail = self.tail
+        dropped = self.dropped - self.reported
+        if head == tail and not dropped:
+            return
+        lines = []
+        for index in range(tail, head):
+            slot = index & self.mask
+            kind = self.kinds[slot]
+            lines.append(json.dumps({
+                't': round(self.times[slot] + self.wall_offset, 6),
+                'event': EVENT_NAMES.get(kind, kind),
+                'a': self.a_values[slot],
+                'b': self.b_values[slot],
+            }))
+        self.tail = head  # Slots can be reused as soon as they're copied out
+        if dropped:
+            lines.append(json.dumps({'t': round(time.time(), 6), 'event': 'dropped', 'a': dropped, 'b': 0}))
+            self.reported += dropped
+        self.write('\n'.join(lines) + '\n')
+
+    def write(self, text):
+        if self.file is None:
+            self.open_next_file()
+        self.file.write(text.encode('utf-8'))
+        self.file.flush()
+        if self.raw_file.tell() >= self.max_file_bytes:
+            self.close_file()
+            self.open_next_file()
+
+    def open_next_file(self):
+        self.file_index += 1
+        path = os.path.join(self.directory, f"telemetry-{self.session}-{self.file_index:04d}.jsonl.gz")
+        self.raw_file = open(path, 'wb')
+        self.file = gzip.GzipFile(fileobj=self.raw_file, mode='wb')
+        self.prune()
+
+    def close_file(self):
+        if self.file is not None:
+            self.file.close()
+            self.raw_file.close()
+            self.file = None
+            self.raw_file = None
+
+    def prune(self):
+        files = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith('telemetry-') and name.endswith('.jsonl.gz'))
+        for name in files[:-self.max_files]:
+            os.remove(os.path.join(self.directory, name))
+
+    def close(self):
+        """Stops the writer thread after a final flush.  Safe to call more than once."""
+        if self.stop_event.is_set():
+            return
+        self.stop_event.set()
+        self.thread.join()
+        self.close_file()
+
+
+def bench(events=1_000_000):
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        telemetry = Telemetry(directory, capacity=1 << 20)
+        emit = telemetry.emit
+        started = time.perf_counter()
+        for index in range(events):
+            emit(COLLISION, index, 3)
+        elapsed = time.perf_counter() - started
+        telemetry.close()
+        print(f"emit(): {elapsed / events * 1e9:.0f} ns per event over {events} events "
+              f"({telemetry.dropped} dropped)")
+
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:] == ['bench']:
+        bench()
+    else:
+        print("usage: python telemetry.py bench")
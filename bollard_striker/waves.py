@@ -0,0 +1,378 @@
+"""
+Wave engine: precomputed spawn tables per level, consumed through a cursor.
+
+Bollards live on a "track" that scrolls down the screen at the bollard speed;
+a bollard's track position is fixed when it spawns and its screen y is the
+scrolled distance minus that position.  For every level the engine builds a
+table of spawns up front (x positions, row gaps and random slack) from a
+weighted mix of patterns:
+
+    scatter   single bollards at random x, like the original game
+    gate      a row of bollards with one opening
+    lanes     bollards lined up in fixed lanes
+    slalom    walls on alternating sides, leaving a gap to weave through
+
+Random numbers for a whole table come from one randbytes() call, so a
+respawn in the game loop is a few array lookups instead of two randint()
+calls, and a seed fully determines every game (replays, benchmarks, bots).
+
+Only BOLLARD_COUNT bollards exist and they're recycled when they leave the
+bottom of the screen.  All of them move at the same speed, so they leave in
+track order: the engine keeps the track positions of the live bollards
+sorted, and the next ones to leave are the lowest.  A pattern row is placed
+at least MIN_CYCLE above each bollard its members will recycle, so those
+have left the screen by the time the row shows up.  Scattered bollards are
+placed against the screen instead, uniformly 50-150 px above it: the
+original game's rule, whatever else is on the track.  Patterns can be
+authored in waves.json (same format as DEFAULT_PATTERNS / DEFAULT_LEVELS)
+and override the built-ins by name.  The file is checked when it's loaded
+(known pattern names, rows with a gap and bollards, whole-number weights);
+one that doesn't check out is ignored with a warning.
+
+    python waves.py bench
+"""
+import array
+import bisect
+import collections
+import json
+import os
+import random
+
+# Playfield and sprite sizes (same as bollard_striker.py and simulation.py)
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+BOLLARD_WIDTH = 50
+BOLLARD_HEIGHT = 50
+BOLLARD_COUNT = 5
+
+WAVES_FILE = 'waves.json'
+
+TABLE_SIZE = 512  # Spawns per level table (the cursor wraps around at the end)
+TABLE_CACHE_SIZE = 16  # Level tables kept built
+MIN_CYCLE = SCREEN_HEIGHT + BOLLARD_HEIGHT  # Track distance between a spawn and the one it recycles
+SPAWN_Y = -BOLLARD_HEIGHT  # Lowest screen y a bollard may spawn at
+SCATTER_RUN = 10  # Bollards per scatter pattern
+SCATTER_JITTER = 100  # Random extra height above SPAWN_Y for scattered bollards (the original -150..-50 spawn)
+SCATTER_GAP = -1  # Table gap marking a scattered bollard, placed against the screen rather than the last row
+MAX_GAP = 2 ** 15 - 1  # Largest row gap a table can hold
+MAX_WEIGHT = 2 ** 16  # Largest total of a level's pattern weights RandomBlock can pick from
+
+# Authored patterns: rows of bollards.  `gap` is the track distance above the previous
+# row, `x` the bollard positions and `shift` a random horizontal offset (0..shift) for the row.
+DEFAULT_PATTERNS = {
+    'gate': [
+        {'gap': 250, 'x': [0, 55, 280, 335], 'shift': SCREEN_WIDTH - 385},
+    ],
+    'lanes': [
+        {'gap': 150, 'x': [55, 375, 695]},
+        {'gap': 150, 'x': [215, 535]},
+        {'gap': 150, 'x': [55, 375, 695]},
+    ],
+    'slalom': [
+        {'gap': 200, 'x': [0, 55, 110, 165]},
+        {'gap': 220, 'x': [585, 640, 695, 750]},
+    ],
+}
+
+# Pattern weights from a level on (the last entry whose level is reached applies).  The
+# default is the original game; waves.json can mix in the patterns above, e.g.
+#   {"levels": [{"level": 1, "weights": {"scatter": 1}},
+#               {"level": 3, "weights": {"scatter": 3, "gate": 1, "slalom": 1}}]}
+DEFAULT_LEVELS = [
+    {'level': 1, 'weights': {'scatter': 1}},
+]
+
+
+# Function to check that a value is a whole number in low..high (bool is an int, but not a number here)
+def check_int(value, what, low, high):
+    if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+        raise ValueError(f"{what} must be a whole number from {low} to {high}")
+    return value
+
+
+# Function to check authored patterns and level weights before any table is built from them,
+# so a bad file fails at startup instead of hanging or crashing at a level-up
+def check_waves(patterns, levels):
+    for name, rows in patterns.items():
+        if name == 'scatter':
+            raise ValueError("'scatter' is built in and can't be a pattern")
+        if not isinstance(rows, list) or not rows:
+            raise ValueError(f"pattern {name} needs a list of rows")
+        for row in rows:
+            if not isinstance(row, dict):
+                raise ValueError(f"pattern {name} has a row that isn't an object")
+            check_int(row.get('gap'), f"{name} gap", 0, MAX_GAP)
+            if not isinstance(row.get('x'), list) or not row['x']:
+                raise ValueError(f"pattern {name} has a row without bollards")
+            for x in row['x']:
+                check_int(x, f"{name} x", -SCREEN_WIDTH, 2 * SCREEN_WIDTH)
+            check_int(row.get('shift', 0), f"{name} shift", 0, SCREEN_WIDTH)
+    if not isinstance(levels, list) or not levels:
+        raise ValueError("levels needs a list of entries")
+    for entry in levels:
+        if not isinstance(entry, dict) or not isinstance(entry.get('weights'), dict):
+            raise ValueError("every level entry needs a level and weights")
+        check_int(entry.get('level'), "level", 1, 2 ** 31)
+        for name, weight in entry['weights'].items():
+            if name != 'scatter' and name not in patterns:
+                raise ValueError(f"unknown pattern {name}")
+            check_int(weight, f"{name} weight", 0, MAX_WEIGHT)
+        if not 0 < sum(entry['weights'].values()) <= MAX_WEIGHT:
+            raise ValueError(f"level {entry['level']} weights must add up to 1..{MAX_WEIGHT}")
+
+
+# Function to load authored patterns and level weights, falling back to the built-ins
+def load_waves(path=WAVES_FILE):
+    patterns = dict(DEFAULT_PATTERNS)
+    levels = DEFAULT_LEVELS
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                authored = json.load(f)
+            if not isinstance(authored, dict) or not isinstance(authored.get('patterns', {}), dict):
+                raise ValueError("not an object of patterns and levels")
+            patterns.update(authored.get('patterns', {}))
+            levels = authored.get('levels', levels)
+            check_waves(patterns, levels)
+            levels = sorted(levels, key=lambda x: x['level'])
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Waves file is empty or corrupted ({e}). Using the built-in patterns.")
+            patterns = dict(DEFAULT_PATTERNS)
+            levels = DEFAULT_LEVELS
+    return patterns, levels
+
+
+class RandomBlock:
+    """A block of 16-bit random values drawn with one randbytes() call."""
+
+    def __init__(self, rng, count):
+        self.values = array.array('H', rng.randbytes(2 * count))
+        self.index = 0
+
+    def below(self, limit):
+        """A value in 0 .. limit - 1 (limit <= 65536)."""
+        value = self.values[self.index % len(self.values)]
+        self.index += 1
+        return value * limit >> 16
+
+
+def build_table(level, seed, patterns, levels):
+    """Spawn table for one level: x, gap, slack and row size arrays of TABLE_SIZE entries.
+
+    A row's gap and slack are stored on its first entry, along with its size;
+    the rest of the row has size 0 and shares the first entry's track position.
+    """
+    rng = random.Random(seed * 1000003 + level)
+    draws = RandomBlock(rng, TABLE_SIZE * 4)
+    weights = levels[0]['weights']
+    for entry in levels:
+        if entry['level'] <= level:
+            weights = entry['weights']
+    names = [name for name in weights if name == 'scatter' or name in patterns]
+    total = sum(weights[name] for name in names)
+
+    xs = array.array('h')
+    gaps = array.array('h')
+    slacks = array.array('h')
+    sizes = array.array('B')
+    while len(xs) < TABLE_SIZE:
+        pick = draws.below(total)
+        for name in names:
+            pick -= weights[name]
+            if pick < 0:
+                break
+        if name == 'scatter':
+            # Scattered bollards aren't ordered; each spawns just above the screen
+            rows = [(SCATTER_GAP, draws.below(SCATTER_JITTER + 1), [draws.below(SCREEN_WIDTH - BOLLARD_WIDTH + 1)])
+                    for _ in range(SCATTER_RUN)]
+        else:
+            rows = []
+            for row in patterns[name]:
+                shift = draws.below(row['shift'] + 1) if row.get('shift') else 0
+                rows.append((row['gap'], 0, [x + shift for x in row['x'][:BOLLARD_COUNT]]))
+        for gap, slack, row_xs in rows:
+            for index, x in enumerate(row_xs):
+                xs.append(min(max(0, x), SCREEN_WIDTH - BOLLARD_WIDTH))
+                gaps.append(gap if index == 0 else 0)
+                slacks.append(slack if index == 0 else 0)
+                sizes.append(len(row_xs) if index == 0 else 0)
+    return xs, gaps, slacks, sizes
+
+
+class WaveEngine:
+    def __init__(self, seed=0, patterns=None, levels=None):
+        self.patterns = DEFAULT_PATTERNS if patterns is None else patterns
+        self.levels = DEFAULT_LEVELS if levels is None else levels
+        self.tables = collections.OrderedDict()
+        self.seed = None
+        self.reset(seed)
+
+    def reset(self, seed=None, level=1):
+        """Starts a new game.  The same seed gives the same spawns."""
+        if seed is not None and seed != self.seed:
+            self.seed = seed
+            self.tables.clear()
+        self.level = level
+        self.distance = 0  # How far the track has scrolled; screen y = distance - track position
+        self.start_table(level)
+        self.clear_track()
+
+    def clear_track(self):
+        """Forgets the bollards on the track: the next spawns start just above the screen."""
+        # Track positions of the live bollards, lowest (next to leave the screen) first.  Start
+        # as if bollards had just left the screen, so the next ones spawn right above it.
+        floor = self.distance - SPAWN_Y
+        self.recent = [floor - MIN_CYCLE] * BOLLARD_COUNT
+        self.spawned = 0
+        self.row_p = floor - MIN_CYCLE
+        while self.cursor < len(self.xs) and not self.sizes[self.cursor]:
+            self.cursor += 1  # Don't start in the middle of a row
+
+    def table(self, level):
+        if level not in self.tables:
+            self.tables[level] = build_table(level, self.seed, self.patterns, self.levels)
+            if len(self.tables) > TABLE_CACHE_SIZE:
+                self.tables.popitem(last=False)
+        return self.tables[level]
+
+    def start_table(self, level):
+        self.table_level = level
+        self.xs, self.gaps, self.slacks, self.sizes = self.table(level)
+        self.table_length = len(self.xs)
+        self.cursor = 0
+
+    def set_level(self, level):
+        """Spawns come from the new level's table from the next row on."""
+        self.level = level
+
+    def advance(self, bollard_speed):
+        """Call once per frame, with the distance the bollards move."""
+        self.distance += bollard_speed
+
+    def spawn(self):
+        """(x, y) of the next bollard."""
+        cursor = self.cursor
+        if cursor == self.table_length or (self.level != self.table_level and self.sizes[cursor]):
+            self.start_table(self.level)
+            cursor = 0
+        size = self.sizes[cursor]
+        recent = self.recent
+        if size:
+            gap = self.gaps[cursor]
+            if gap == SCATTER_GAP:
+                p = self.distance - SPAWN_Y + self.slacks[cursor]
+            else:
+                # A new row: `gap` above the previous one, and far enough above the bollards its
+                # members recycle (the next `size` to leave) that those are gone when it shows up
+                p = self.row_p + gap
+                recycled = recent[size - 1] + MIN_CYCLE + self.slacks[cursor]
+                if recycled > p:
+                    p = recycled
+            self.row_p = p
+        self.spawned += 1
+        self.cursor = cursor + 1
+        y = self.distance - self.row_p
+        if y > SPAWN_Y:
+            y = SPAWN_Y
+        # This spawn is the bollard that just left the screen, now at its new track position
+        del recent[0]
+        bisect.insort(recent, self.distance - y)
+        return self.xs[cursor], y
+
+    def state(self):
+        """Everything spawn() depends on, as a flat tuple of numbers (see game_state.py).
+        The tables aren't included: they're rebuilt from the seed and level."""
+        return (self.seed, self.level, self.table_level, self.distance, self.cursor, self.spawned,
+                self.row_p, *self.recent)
+
+    def set_state(self, seed, level, table_level, distance, cursor, spawned, row_p, *recent):
+        if seed != self.seed:
+            self.seed = seed
+            self.tables.clear()
+            self.table_level = None
+        if table_level != self.table_level:
+            self.start_table(table_level)
+        self.level = level
+        self.distance = distance
+        self.cursor = cursor
+        self.spawned = spawned
+        self.row_p = row_p
+        self.recent[:] = recent
+
+    def respawn_all(self, bollard_list):
+        """Puts every bollard back above the screen (game start, after a collision)."""
+        self.clear_track()
+        for bollard in bollard_list:
+            bollard[0], bollard[1] = self.spawn()
+
+
+def respawn_heights(spawn_y, advance, bollard_speed, frames=100_000):
+    """Screen y of every respawn over `frames` frames of the game loop's update."""
+    bollards = [spawn_y() for _ in range(BOLLARD_COUNT)]
+    heights = []
+    for _ in range(frames):
+        advance(bollard_speed)
+        for index in range(BOLLARD_COUNT):
+            bollards[index] += bollard_speed
+            if bollards[index] > SCREEN_HEIGHT:
+                bollards[index] = spawn_y()
+                heights.append(bollards[index])
+    return heights
+
+
+def bench(spawns=200_000):
+    import time
+    engine = WaveEngine(seed=1)
+    started = time.perf_counter()
+    engine.table(1)
+    engine.table(3)
+    engine.table(5)
+    build_ms = (time.perf_counter() - started) * 1000 / 3
+
+    spawn = engine.spawn
+    started = time.perf_counter()
+    for _ in range(spawns):
+        spawn()
+    engine_ns = (time.perf_counter() - started) / spawns * 1e9
+
+    rng = random.Random(1)
+    started = time.perf_counter()
+    for _ in range(spawns):
+        rng.randint(0, SCREEN_WIDTH - BOLLARD_WIDTH)
+        rng.randint(-150, -50)
+    randint_ns = (time.perf_counter() - started) / spawns * 1e9
+
+    first = WaveEngine(seed=42)
+    second = WaveEngine(seed=42)
+    same = all(first.spawn() == second.spawn() for _ in range(10_000))
+    print(f"table build: {build_ms:.2f} ms per level ({TABLE_SIZE} spawns)")
+    print(f"spawn(): {engine_ns:.0f} ns, two randint() calls: {randint_ns:.0f} ns")
+    print(f"same seed, same spawns: {same}")
+
+    # Scatter against the original rule: every bollard that leaves respawns at randint(-150, -50)
+    print("respawn height, scatter vs randint(-150, -50):")
+    for bollard_speed in (7, 12, 20):
+        # Several seeds: one level's table repeats after TABLE_SIZE spawns
+        heights, original = [], []
+        for seed in range(20):
+            engine = WaveEngine(seed=seed)
+            rng = random.Random(seed)
+            heights += respawn_heights(lambda: engine.spawn()[1], engine.advance, bollard_speed, 10_000)
+            original += respawn_heights(lambda: rng.randint(-150, -50), lambda distance: None, bollard_speed, 10_000)
+        # Largest gap between the two distributions' CDFs (Kolmogorov-Smirnov distance)
+        counts, original_counts = collections.Counter(heights), collections.Counter(original)
+        cdf = original_cdf = distance = 0.0
+        for y in range(min(heights + original), max(heights + original) + 1):
+            cdf += counts[y] / len(heights)
+            original_cdf += original_counts[y] / len(original)
+            distance = max(distance, abs(cdf - original_cdf))
+        print(f"  speed {bollard_speed:>2}: mean {sum(heights) / len(heights):.1f} vs {sum(original) / len(original):.1f}, "
+              f"at -50 {counts[-50] / len(heights):.1%} vs {original_counts[-50] / len(original):.1%}, "
+              f"range {min(heights)}..{max(heights)}, CDF distance {distance:.3f} ({len(heights)} respawns)")
+
+if __name__ == '__main__':
+    import sys
+    if sys.argv[1:] == ['bench']:
+        bench()
+    else:
+        print("usage: python waves.py bench")